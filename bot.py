@@ -1,11 +1,15 @@
+import asyncio
+import html
 import logging
 import os
-from typing import List
+from contextlib import ExitStack
+from functools import partial
+from typing import Dict, List, Optional
 
 from aiogram import Bot, Dispatcher, F, Router
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.filters import CommandStart
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import (
@@ -16,9 +20,29 @@ from aiogram.types import (
 )
 from dotenv import load_dotenv
 
-from db import save_resumes_to_db, get_top_resumes
+from db import (
+    delete_old_searches,
+    has_search,
+    insert_search,
+    mark_search_finished,
+    select_known_resumes,
+    select_search_hits,
+    select_stored_resume,
+    select_top_resumes,
+)
+from jobs import Job, JobLimitExceeded, JobManager, JobStatus
+from repository import ResumeRepository
+from parser.browser_service import BrowserService
+from parser.checkpoint import CrawlStateStore
+from parser.dedup import Deduplicator
+from parser.federated import FederatedResult, FederatedSearch, robota_filters
+from parser.html_cache import HtmlCache
 from parser.parser_factory import ResumeParserFactory
+from parser.ranking import TopKRanker
+from parser.robota_ua.robota_ua_parser import RobotaUaParser
 from parser.resume_types import Resume
+from parser.scheduler import PolitenessScheduler
+from parser.work_ua.work_ua_parser import WorkUaParser
 from parser.robota_ua.utils import (
     RobotaCity,
     RobotaSearchType,
@@ -32,13 +56,49 @@ from parser.work_ua.utils import (
     WorkUaExperience,
     WorkUaPostingPeriod,
 )
-from format_resume import format_resume
+from format_resume import format_resume, format_snippet
 
 load_dotenv()
 
 TOKEN = os.getenv("BOT_TOKEN")
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", 1))
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", 2))
+MAX_JOBS_PER_USER = int(os.getenv("MAX_JOBS_PER_USER", 1))
+HTML_CACHE_PATH = os.getenv("HTML_CACHE_PATH")
+HTML_CACHE_TTL = float(os.getenv("HTML_CACHE_TTL", 6 * 3600))
+REQUESTS_PER_SECOND = float(os.getenv("REQUESTS_PER_SECOND", 2))
+INCREMENTAL_CRAWL = os.getenv("INCREMENTAL_CRAWL", "1") == "1"
+DETAIL_TOP_K = int(os.getenv("DETAIL_TOP_K", 50))
+FRONTIER_LOOKAHEAD = int(os.getenv("FRONTIER_LOOKAHEAD", 3))
+WARM_BROWSERS = int(os.getenv("WARM_BROWSERS", 1))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", 20)) or None
+CRAWL_TIME_BUDGET = float(os.getenv("CRAWL_TIME_BUDGET", 0)) or None
+SEARCH_MAX_AGE = float(os.getenv("SEARCH_MAX_AGE", 7 * 24 * 3600))
+SEARCH_CLEANUP_INTERVAL = float(os.getenv("SEARCH_CLEANUP_INTERVAL", 3600))
+DB_READERS = int(os.getenv("DB_READERS", 4))
+
+FEDERATED_PLATFORM = "both"
+FEDERATED_PLATFORM_NAME = "work.ua + robota.ua"
 
 resume_router = Router()
+job_manager = JobManager(
+    max_workers=MAX_CONCURRENT_JOBS, max_jobs_per_user=MAX_JOBS_PER_USER
+)
+html_cache = (
+    HtmlCache(HTML_CACHE_PATH, ttl=HTML_CACHE_TTL) if HTML_CACHE_PATH else None
+)
+scheduler = PolitenessScheduler(rate=REQUESTS_PER_SECOND)
+checkpoints = CrawlStateStore()
+repository = ResumeRepository(readers=DB_READERS)
+browsers = BrowserService(
+    {
+        WorkUaParser.SITE: WorkUaParser.create_browser,
+        RobotaUaParser.SITE: RobotaUaParser.create_browser,
+    },
+    warm={RobotaUaParser.SITE: WARM_BROWSERS},
+    session_checks={RobotaUaParser.SITE: RobotaUaParser.ensure_logged_in},
+)
+background_tasks = set()
 
 
 class ResumeForm(StatesGroup):
@@ -60,6 +120,69 @@ async def start(message: Message, state: FSMContext) -> None:
     await show_platform_options(message)
 
 
+@resume_router.message(Command("jobs"))
+async def show_jobs(message: Message) -> None:
+    jobs = job_manager.get_user_jobs(message.from_user.id)
+    if not jobs:
+        await message.answer("У вас немає завдань.")
+        return
+
+    lines = [
+        f"#{job.id} {job.description}: {job.status.value}" for job in jobs
+    ]
+    await message.answer("\n".join(lines))
+
+
+@resume_router.message(Command("stats"))
+async def show_stats(message: Message) -> None:
+    stats = scheduler.stats()
+    browser_stats = await asyncio.to_thread(browsers.stats)
+    browser_lines = [
+        f"{site}: браузерів {site_stats['live']}, "
+        f"вільних {site_stats['idle']}, "
+        f"пам'ять {site_stats['rss'] / 1024 / 1024:.0f} МБ"
+        for site, site_stats in browser_stats.items()
+    ]
+    if not stats:
+        await message.answer(
+            "\n".join(["Ще не було жодного запиту."] + browser_lines)
+        )
+        return
+
+    lines = [
+        f"{host}: {host_stats['rate']:.2f} запитів/с, "
+        f"в роботі {host_stats['in_flight']}, "
+        f"у черзі {host_stats['queue_depth']}, "
+        f"ліміт {host_stats['concurrency_limit']:.1f}, "
+        f"помилки {host_stats['error_rate']:.0%}, "
+        f"пауза {host_stats['backoff']:.0f}с"
+        for host, host_stats in stats.items()
+    ]
+    await message.answer("\n".join(lines + browser_lines))
+
+
+@resume_router.message(Command("search"))
+async def search_stored_resumes(
+    message: Message, command: CommandObject
+) -> None:
+    if not command.args:
+        await message.answer(
+            "Вкажіть, що шукати, наприклад: /search python django київ"
+        )
+        return
+
+    hits = await repository.read(select_search_hits, command.args)
+    if not hits:
+        await message.answer("У збережених резюме нічого не знайдено.")
+        return
+
+    for i, (resume, snippet) in enumerate(hits, 1):
+        await message.answer(
+            f"Резюме #{i}\n\n{format_snippet(snippet)}\n\n"
+            f"{html.escape(format_resume(resume))}"
+        )
+
+
 async def show_platform_options(message: Message) -> None:
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
@@ -70,7 +193,13 @@ async def show_platform_options(message: Message) -> None:
                 InlineKeyboardButton(
                     text="Robota.ua", callback_data="platform_robota.ua"
                 ),
-            ]
+            ],
+            [
+                InlineKeyboardButton(
+                    text="Обидва сайти",
+                    callback_data=f"platform_{FEDERATED_PLATFORM}",
+                ),
+            ],
         ]
     )
     await message.answer(
@@ -84,6 +213,8 @@ async def show_platform_options(message: Message) -> None:
 async def set_platform(callback: CallbackQuery, state: FSMContext) -> None:
     platform = callback.data.split("_")[1]
     await state.update_data(platform=platform)
+    if platform == FEDERATED_PLATFORM:
+        platform = FEDERATED_PLATFORM_NAME
     await callback.message.edit_text(f"Платформа обрана: {platform}")
     await state.set_state(ResumeForm.choosing_position)
     await callback.message.answer("Введіть позицію:")
@@ -100,7 +231,7 @@ async def show_city_options(message: Message, state: FSMContext) -> None:
     data = await state.get_data()
     platform = data.get("platform")
 
-    if platform == "work.ua":
+    if platform != "robota.ua":
         city_enum = WorkUaCity
 
     else:
@@ -137,7 +268,7 @@ async def show_search_type_options(
     data = await state.get_data()
     platform = data.get("platform")
 
-    if platform == "work.ua":
+    if platform != "robota.ua":
         search_type_enum = WorkUaSearchType
     else:
         search_type_enum = RobotaSearchType
@@ -258,7 +389,7 @@ async def show_experience_options(message: Message, state: FSMContext) -> None:
     data = await state.get_data()
     platform = data.get("platform")
 
-    if platform == "work.ua":
+    if platform != "robota.ua":
         experience_enum = WorkUaExperience
     else:
         experience_enum = RobotaExperienceLevel
@@ -298,7 +429,7 @@ async def show_public_period_options(
     data = await state.get_data()
     platform = data.get("platform")
 
-    if platform == "work.ua":
+    if platform != "robota.ua":
         period_enum = WorkUaPostingPeriod
     else:
         period_enum = RobotaPostingPeriod
@@ -341,15 +472,18 @@ async def show_filters_summary(message: Message, state: FSMContext) -> None:
     data = await state.get_data()
     platform = data.get("platform")
 
-    if platform == "work.ua":
+    if platform != "robota.ua":
         salary_from = data.get("salary_from_ukraine")
         salary_to = data.get("salary_to_ukraine")
     else:
         salary_from = data.get("salary_from")
         salary_to = data.get("salary_to")
 
+    platform_name = (
+        FEDERATED_PLATFORM_NAME if platform == FEDERATED_PLATFORM else platform
+    )
     filters_summary = (
-        f"Платформа: {data.get('platform')}\n"
+        f"Платформа: {platform_name}\n"
         f"Позиція: {data.get('position')}\n"
         f"Місто: {data.get('city_ukraine')}\n"
         f"Тип пошуку: {data.get('search_type_ukraine')}\n"
@@ -383,7 +517,7 @@ async def confirm_filters(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.message.edit_text(
         "Фільтри підтверджені. Починаємо парсинг резюме..."
     )
-    await parse_resumes(callback.message, state)
+    await parse_resumes(callback.message, state, callback.from_user.id)
 
 
 @resume_router.callback_query(
@@ -396,11 +530,134 @@ async def cancel_filters(callback: CallbackQuery, state: FSMContext) -> None:
     )
 
 
-async def parse_resumes(message: Message, state: FSMContext) -> None:
+def create_parser(platform: str, limit: int = 10):
+    """
+    A parser set up from the bot settings.
+
+    With DETAIL_TOP_K set, the two-phase crawl picks the resumes to
+    fetch and FRONTIER_LOOKAHEAD isn't used. DETAIL_TOP_K=0 crawls
+    through the frontier instead.
+    """
+
+    return ResumeParserFactory.get_parser(
+        platform,
+        workers=PARSER_WORKERS,
+        cache=html_cache,
+        scheduler=scheduler,
+        checkpoints=checkpoints,
+        known_resumes=(
+            partial(repository.read_sync, select_known_resumes)
+            if INCREMENTAL_CRAWL
+            else None
+        ),
+        detail_top_k=max(DETAIL_TOP_K, limit) if DETAIL_TOP_K else None,
+        frontier_lookahead=FRONTIER_LOOKAHEAD,
+        browsers=browsers,
+    )
+
+
+def create_ranker(limit: int) -> TopKRanker:
+    return TopKRanker(
+        limit, max_pages=CRAWL_MAX_PAGES, max_seconds=CRAWL_TIME_BUDGET
+    )
+
+
+def find_search(urls: List[str]) -> Optional[int]:
+    """
+    Claim the search of an unfinished crawl of urls, if it's still
+    stored and no other job is running it.
+    """
+
+    for url in urls:
+        unfinished = checkpoints.find_unfinished(url)
+        if (
+            unfinished
+            and unfinished.search_id is not None
+            and repository.read_sync(has_search, unfinished.search_id)
+            and checkpoints.claim_search(unfinished.search_id)
+        ):
+            return unfinished.search_id
+    return None
+
+
+def run_federated_crawl(
+    searches: Dict[str, dict],
+    limit: int = 10,
+    user_id: Optional[int] = None,
+    description: Optional[str] = None,
+) -> FederatedResult:
+    """
+    Crawl every site in searches at once and rank the merged resumes.
+
+    searches maps a site to the filters for its build_search_url. The
+    resumes are stored under a search of their own, or under the search
+    of the unfinished crawl being resumed, so searches of different
+    users don't overwrite each other. The search is claimed for this
+    job while it runs.
+    """
+
+    search = FederatedSearch()
+    ranker = TopKRanker(limit)
+
+    with ExitStack() as stack:
+        parsers = {
+            site: stack.enter_context(create_parser(site, limit))
+            for site in searches
+        }
+        urls = {
+            site: parsers[site].build_search_url(**filters)
+            for site, filters in searches.items()
+        }
+
+        search_id = find_search(list(urls.values()))
+        if search_id is None:
+            search_id = repository.write_sync(
+                insert_search, user_id, description
+            )
+            checkpoints.claim_search(search_id)
+        else:
+            ranker.extend(
+                repository.read_sync(
+                    select_top_resumes, limit, None, search_id
+                )
+            )
+        stack.callback(checkpoints.release_search, search_id)
+
+        streams = {
+            site: parsers[site].iter_crawl(
+                url,
+                create_ranker(limit),
+                keywords=searches[site]["position"].split(),
+                search_id=search_id,
+            )
+            for site, url in urls.items()
+        }
+
+        deduplicator = Deduplicator(
+            load=lambda url: repository.read_sync(
+                select_stored_resume, url, search_id
+            )
+        )
+        repository.save_resumes(
+            ranker.track(deduplicator.dedup(search.merge(streams))),
+            search_id,
+        )
+        repository.write_sync(mark_search_finished, search_id)
+
+    return FederatedResult(
+        resumes=ranker.results(),
+        timings=search.timings,
+        errors=search.errors,
+    )
+
+
+async def parse_resumes(
+    message: Message, state: FSMContext, user_id: int
+) -> None:
     data = await state.get_data()
     platform = data.get("platform")
     position = data.get("position")
-    if platform == "work.ua":
+    if platform != "robota.ua":
         city = next(
             exp for exp in WorkUaCity if exp.value[0] == data.get("city")
         )
@@ -455,9 +712,7 @@ async def parse_resumes(message: Message, state: FSMContext) -> None:
             if exp.value[0] == data.get("public_period")
         )
 
-    parser = ResumeParserFactory.get_parser(platform)
-
-    resumes = parser.parse_resumes(
+    filters = dict(
         position=position,
         city=city,
         search_type=search_type,
@@ -466,31 +721,109 @@ async def parse_resumes(message: Message, state: FSMContext) -> None:
         experience=[experience],
         public_period=public_period,
     )
-    save_resumes_to_db(resumes)
     await state.clear()
-    await message.answer("Парсинг завершено. Виводжу топ-10 резюме:")
-    await display_top_resumes(message, resumes)
+
+    if platform == FEDERATED_PLATFORM:
+        searches = {
+            "work.ua": filters,
+            "robota.ua": robota_filters(**filters),
+        }
+    else:
+        searches = {platform: filters}
+
+    async def on_done(job: Job) -> None:
+        if job.status == JobStatus.FAILED:
+            await message.answer(
+                f"Завдання #{job.id} завершилось з помилкою. "
+                "Спробуйте ще раз з команди /start."
+            )
+            return
+
+        timings = ", ".join(
+            f"{site}: {seconds:.1f} с"
+            for site, seconds in job.result.timings.items()
+        )
+        await message.answer(
+            f"Парсинг #{job.id} завершено ({timings}). "
+            "Виводжу топ-10 резюме:"
+        )
+        for site, error in job.result.errors.items():
+            await message.answer(f"Помилка парсингу {site}: {error}")
+        await display_top_resumes(message, job.result.resumes)
+
+    description = f"{platform}: {position}"
+    try:
+        job = job_manager.submit(
+            user_id,
+            description,
+            run_federated_crawl,
+            searches,
+            10,
+            user_id,
+            description,
+            on_done=on_done,
+        )
+    except JobLimitExceeded:
+        await message.answer(
+            "У вас вже є активне завдання. "
+            "Перевірте його статус командою /jobs."
+        )
+        return
+
+    await message.answer(
+        f"Завдання #{job.id} додано в чергу. "
+        "Результати прийдуть у цей чат."
+    )
 
 
-async def display_top_resumes(
-    message: Message, resumes: List[Resume], limit: int = 10
-):
-    top_resumes = get_top_resumes(limit)
+async def display_top_resumes(message: Message, top_resumes: List[Resume]):
     for i, resume in enumerate(top_resumes, 1):
-        formatted_resume = format_resume(resume)
+        formatted_resume = html.escape(format_resume(resume))
         await message.answer(f"Резюме #{i}\n\n{formatted_resume}")
 
 
+async def age_out_old_searches() -> None:
+    while True:
+        try:
+            removed = await repository.write(
+                delete_old_searches, SEARCH_MAX_AGE
+            )
+            if removed:
+                logging.info(f"Removed {removed} old searches")
+        except Exception as e:
+            logging.error(f"Error removing old searches: {e}")
+        await asyncio.sleep(SEARCH_CLEANUP_INTERVAL)
+
+
+async def start_background_tasks() -> None:
+    task = asyncio.create_task(age_out_old_searches())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def stop_background_tasks() -> None:
+    for task in list(background_tasks):
+        task.cancel()
+
+
 def main() -> None:
     logging.basicConfig(level=logging.INFO)
     dp = Dispatcher()
     dp.include_router(resume_router)
+    dp.startup.register(start_background_tasks)
+    dp.shutdown.register(stop_background_tasks)
 
     bot = Bot(
         token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
 
-    dp.run_polling(bot, skip_updates=True)
+    browsers.start()
+    try:
+        dp.run_polling(bot, skip_updates=True)
+    finally:
+        job_manager.shutdown()
+        browsers.close()
+        repository.close()
 
 
 if __name__ == "__main__":
@@ -1,21 +1,150 @@
+import hashlib
+import itertools
 import sqlite3
-from typing import List
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import astuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from parser.dedup import (
+    MinHasher,
+    merge_resumes,
+    name_key,
+    normalize,
+    resume_features,
+)
 from parser.resume_types import Resume, Experience, Education, Language
+from parser.skills import skill_keys
+from parser.utils import resume_key
+
+DUPLICATE_THRESHOLD = 0.5
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+MAX_QUERY_VARIABLES = 500
+CHILD_TABLES = (
+    "experiences",
+    "education",
+    "languages",
+    "resume_signatures",
+    "resume_skills",
+)
+RESUME_COLUMNS = (
+    "id",
+    "full_name",
+    "position",
+    "experience_years",
+    "skills",
+    "details",
+    "location",
+    "salary",
+    "url",
+    "score",
+    "fingerprint",
+    "seen_at",
+    "name_key",
+    "resume_key",
+    "content_hash",
+)
+INSERT_STATEMENTS = {
+    "resumes": f"""
+        INSERT INTO resumes ({", ".join(RESUME_COLUMNS)})
+        VALUES ({", ".join("?" for _ in RESUME_COLUMNS)})
+        ON CONFLICT (id) DO UPDATE SET {", ".join(
+            f"{column} = excluded.{column}" for column in RESUME_COLUMNS[1:]
+        )}
+    """,
+    "resume_signatures": """
+        INSERT INTO resume_signatures (resume_id, band, bucket)
+        VALUES (?, ?, ?)
+    """,
+    "experiences": """
+        INSERT INTO experiences (resume_id, position, company, company_type, description, years)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    "education": """
+        INSERT INTO education (resume_id, name, type_education, location, year)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "languages": """
+        INSERT INTO languages (resume_id, name, level)
+        VALUES (?, ?, ?)
+    """,
+    "resume_skills": """
+        INSERT OR IGNORE INTO resume_skills (skill_id, resume_id)
+        VALUES (?, ?)
+    """,
+    "resumes_fts": """
+        INSERT INTO resumes_fts (rowid, full_name, position, skills, details, experience, location)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+}
+LINK_STATEMENT = """
+    INSERT INTO search_resumes (search_id, resume_id, score, seen_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (search_id, resume_id) DO UPDATE SET
+        score = excluded.score, seen_at = excluded.seen_at
+"""
+hasher = MinHasher()
 
 
 def clear_database(conn: sqlite3.Connection):
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM education")
-    cursor.execute("DELETE FROM experiences")
+    for table in CHILD_TABLES:
+        cursor.execute(f"DELETE FROM {table}")
+    cursor.execute("DELETE FROM resumes_fts")
+    cursor.execute("DELETE FROM search_resumes")
     cursor.execute("DELETE FROM resumes")
-    cursor.execute("DELETE FROM languages")
     conn.commit()
 
 
+def connect(
+    db_path: str = "resumes.db", check_same_thread: bool = True
+) -> sqlite3.Connection:
+    """
+    Open the database in WAL mode, so searches can be read while
+    other searches are being written. WAL with synchronous=NORMAL only
+    syncs at checkpoints, a power loss can drop the last commits but
+    never corrupts the database.
+    """
+
+    conn = sqlite3.connect(
+        db_path, timeout=60, check_same_thread=check_same_thread
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
+
+@contextmanager
+def open_database(db_path: str = "resumes.db") -> Iterator[sqlite3.Connection]:
+    """A connection with sqlite3.Row rows and the tables created."""
+
+    conn = connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        create_tables(conn)
+        yield conn
+    finally:
+        conn.close()
+
+
 def create_tables(conn: sqlite3.Connection):
     cursor = conn.cursor()
 
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS searches (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            description TEXT,
+            created_at REAL,
+            finished_at REAL
+        )
+        """
+    )
+
     cursor.execute(
         """
         CREATE TABLE IF NOT EXISTS resumes (
@@ -28,10 +157,47 @@ def create_tables(conn: sqlite3.Connection):
             location TEXT,
             salary INTEGER,
             url TEXT,
-            score REAL
+            score REAL,
+            fingerprint TEXT,
+            seen_at REAL,
+            name_key TEXT,
+            resume_key TEXT,
+            content_hash TEXT
         )
         """
     )
+    add_missing_columns(cursor)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_resumes_url ON resumes (url)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_resumes_score ON resumes (score DESC)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_resumes_name ON resumes (name_key)"
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS search_resumes (
+            search_id INTEGER,
+            resume_id INTEGER,
+            score REAL,
+            seen_at REAL,
+            PRIMARY KEY (search_id, resume_id),
+            FOREIGN KEY (search_id) REFERENCES searches (id),
+            FOREIGN KEY (resume_id) REFERENCES resumes (id)
+        ) WITHOUT ROWID
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_search_resumes_score "
+        "ON search_resumes (search_id, score DESC)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_search_resumes_resume "
+        "ON search_resumes (resume_id)"
+    )
 
     cursor.execute(
         """
@@ -74,23 +240,397 @@ def create_tables(conn: sqlite3.Connection):
         """
     )
 
-    conn.commit()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS resume_signatures (
+            resume_id INTEGER,
+            band INTEGER,
+            bucket INTEGER,
+            FOREIGN KEY (resume_id) REFERENCES resumes (id)
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_resume_signatures_bucket "
+        "ON resume_signatures (band, bucket)"
+    )
 
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS skills (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE
+        )
+        """
+    )
+    if not cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'resume_skills'"
+    ).fetchone():
+        create_skill_index(cursor)
 
-def save_resumes_to_db(resumes: List[Resume], db_path: str = "resumes.db"):
-    conn = sqlite3.connect(db_path)
-    create_tables(conn)
-    clear_database(conn)
-    cursor = conn.cursor()
+    for table in CHILD_TABLES:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_resume "
+            f"ON {table} (resume_id)"
+        )
+
+    if not cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'resumes_fts'"
+    ).fetchone():
+        create_fts_index(cursor)
 
-    for resume in resumes:
-        skills = ", ".join(resume.skills) if resume.skills else None
+    if not cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'idx_resumes_key'"
+    ).fetchone():
+        add_resume_keys(cursor)
         cursor.execute(
+            "CREATE UNIQUE INDEX idx_resumes_key ON resumes (resume_key)"
+        )
+
+    conn.commit()
+
+
+def intern_skills(cursor: sqlite3.Cursor, keys: Iterable[str]) -> Dict[str, int]:
+    """Ids of canonical skill names, adding the ones not seen yet."""
+
+    keys = list(dict.fromkeys(keys))
+    cursor.executemany(
+        "INSERT OR IGNORE INTO skills (name) VALUES (?)",
+        [(key,) for key in keys],
+    )
+
+    skill_ids = {}
+    for start in range(0, len(keys), MAX_QUERY_VARIABLES):
+        part = keys[start:start + MAX_QUERY_VARIABLES]
+        placeholders = ", ".join("?" for _ in part)
+        skill_ids.update(
+            cursor.execute(
+                f"SELECT name, id FROM skills WHERE name IN ({placeholders})",
+                part,
+            ).fetchall()
+        )
+    return skill_ids
+
+
+def create_skill_index(cursor: sqlite3.Cursor):
+    """
+    Create the skill posting table and fill it from the stored skills.
+
+    Postings are clustered by skill, so the resumes with a skill are one
+    range of the primary key.
+    """
+
+    cursor.execute(
+        """
+        CREATE TABLE resume_skills (
+            skill_id INTEGER,
+            resume_id INTEGER,
+            PRIMARY KEY (skill_id, resume_id),
+            FOREIGN KEY (skill_id) REFERENCES skills (id),
+            FOREIGN KEY (resume_id) REFERENCES resumes (id)
+        ) WITHOUT ROWID
+        """
+    )
+
+    resume_skills = [
+        (resume_id, skill_keys(skills.split(", ")))
+        for resume_id, skills in cursor.execute(
+            "SELECT id, skills FROM resumes WHERE skills IS NOT NULL"
+        ).fetchall()
+    ]
+    skill_ids = intern_skills(
+        cursor, (key for _, keys in resume_skills for key in keys)
+    )
+    cursor.executemany(
+        INSERT_STATEMENTS["resume_skills"],
+        [
+            (skill_ids[key], resume_id)
+            for resume_id, keys in resume_skills
+            for key in keys
+        ],
+    )
+
+
+def create_fts_index(cursor: sqlite3.Cursor):
+    """Create the full-text index and fill it from the stored resumes."""
+
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE resumes_fts USING fts5(
+            full_name,
+            position,
+            skills,
+            details,
+            experience,
+            location,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO resumes_fts (rowid, full_name, position, skills, details, experience, location)
+        SELECT
+            id,
+            full_name,
+            position,
+            skills,
+            details,
+            (
+                SELECT group_concat(
+                    COALESCE(position, '') || ' ' || COALESCE(company, '')
+                        || ' ' || COALESCE(description, ''),
+                    ' '
+                )
+                FROM experiences WHERE resume_id = resumes.id
+            ),
+            location
+        FROM resumes
+        """
+    )
+
+
+def add_missing_columns(cursor: sqlite3.Cursor):
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(resumes)")}
+    for name, column_type in (
+        ("fingerprint", "TEXT"),
+        ("seen_at", "REAL"),
+        ("name_key", "TEXT"),
+        ("resume_key", "TEXT"),
+        ("content_hash", "TEXT"),
+    ):
+        if name not in columns:
+            cursor.execute(
+                f"ALTER TABLE resumes ADD COLUMN {name} {column_type}"
+            )
+
+    if "name_key" not in columns:
+        cursor.executemany(
+            "UPDATE resumes SET name_key = ? WHERE id = ?",
+            [
+                (" ".join(sorted(normalize(full_name))) or None, id)
+                for id, full_name in cursor.execute(
+                    "SELECT id, full_name FROM resumes"
+                ).fetchall()
+            ],
+        )
+
+
+def add_resume_keys(cursor: sqlite3.Cursor):
+    """
+    Key the resumes of an older database, keeping one row per key.
+
+    Older databases stored a copy of a resume for every search that
+    found it. The newest copy is kept and the searches of all copies
+    are linked to it in search_resumes.
+    """
+
+    cursor.executemany(
+        "UPDATE resumes SET resume_key = ? WHERE id = ?",
+        [
+            (resume_key(url), id)
+            for id, url in cursor.execute(
+                "SELECT id, url FROM resumes WHERE resume_key IS NULL"
+            ).fetchall()
+        ],
+    )
+    kept = {
+        key: (id, score)
+        for key, id, score in cursor.execute(
+            "SELECT resume_key, MAX(id), score FROM resumes GROUP BY resume_key"
+        ).fetchall()
+    }
+
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(resumes)")}
+    if "search_id" in columns:
+        for index in (
+            "idx_resumes_search_key",
+            "idx_resumes_search_score",
+            "idx_resumes_search_name",
+        ):
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+        cursor.executemany(
+            LINK_STATEMENT,
+            [
+                (search_id, *kept[key], seen_at)
+                for search_id, key, seen_at in cursor.execute(
+                    """
+                    SELECT search_id, resume_key, seen_at FROM resumes
+                    WHERE search_id IS NOT NULL
+                    ORDER BY seen_at
+                    """
+                ).fetchall()
+            ],
+        )
+
+    kept_ids = {id for id, _ in kept.values()}
+    delete_resumes(
+        cursor,
+        [
+            row[0]
+            for row in cursor.execute("SELECT id FROM resumes").fetchall()
+            if row[0] not in kept_ids
+        ],
+    )
+
+
+def delete_children(cursor: sqlite3.Cursor, resume_ids: List[int]):
+    params = [(resume_id,) for resume_id in resume_ids]
+    for table in CHILD_TABLES:
+        cursor.executemany(f"DELETE FROM {table} WHERE resume_id = ?", params)
+    cursor.executemany("DELETE FROM resumes_fts WHERE rowid = ?", params)
+
+
+def delete_resumes(cursor: sqlite3.Cursor, resume_ids: List[int]):
+    params = [(resume_id,) for resume_id in resume_ids]
+    delete_children(cursor, resume_ids)
+    cursor.executemany("DELETE FROM search_resumes WHERE resume_id = ?", params)
+    cursor.executemany("DELETE FROM resumes WHERE id = ?", params)
+
+
+def delete_search_resumes(cursor: sqlite3.Cursor, search_id: int):
+    """Unlink the resumes of search_id, deleting the ones no search has."""
+
+    resume_ids = [
+        row[0]
+        for row in cursor.execute(
+            """
+            SELECT resume_id FROM search_resumes AS link
+            WHERE search_id = ? AND NOT EXISTS (
+                SELECT 1 FROM search_resumes AS other
+                WHERE other.resume_id = link.resume_id
+                    AND other.search_id != link.search_id
+            )
+            """,
+            (search_id,),
+        ).fetchall()
+    ]
+    cursor.execute(
+        "DELETE FROM search_resumes WHERE search_id = ?", (search_id,)
+    )
+    delete_resumes(cursor, resume_ids)
+
+
+def insert_search(
+    conn: sqlite3.Connection,
+    user_id: Optional[int] = None,
+    description: Optional[str] = None,
+) -> int:
+    with conn:
+        return conn.execute(
             """
-            INSERT INTO resumes (full_name, position, experience_years, skills, details, location, salary, url, score)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO searches (user_id, description, created_at)
+            VALUES (?, ?, ?)
             """,
+            (user_id, description, time.time()),
+        ).lastrowid
+
+
+def has_search(conn: sqlite3.Connection, search_id: int) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM searches WHERE id = ?", (search_id,)
+    ).fetchone()
+    return row is not None
+
+
+def mark_search_finished(conn: sqlite3.Connection, search_id: int):
+    with conn:
+        conn.execute(
+            "UPDATE searches SET finished_at = ? WHERE id = ?",
+            (time.time(), search_id),
+        )
+
+
+def delete_old_searches(conn: sqlite3.Connection, max_age: float) -> int:
+    """Delete searches, with their resumes, older than max_age seconds."""
+
+    cursor = conn.cursor()
+    search_ids = [
+        row[0]
+        for row in cursor.execute(
+            "SELECT id FROM searches "
+            "WHERE COALESCE(finished_at, created_at) < ?",
+            (time.time() - max_age,),
+        ).fetchall()
+    ]
+
+    for search_id in search_ids:
+        delete_search_resumes(cursor, search_id)
+        cursor.execute("DELETE FROM searches WHERE id = ?", (search_id,))
+        conn.commit()
+
+    return len(search_ids)
+
+
+def clear_search(conn: sqlite3.Connection, search_id: Optional[int] = None):
+    """
+    Drop the resumes of search_id, or of every search if it's None.
+
+    A resume that another search found as well is only unlinked.
+    """
+
+    if search_id is None:
+        clear_database(conn)
+        return
+
+    delete_search_resumes(conn.cursor(), search_id)
+    conn.commit()
+
+
+def create_search(
+    user_id: Optional[int] = None,
+    description: Optional[str] = None,
+    db_path: str = "resumes.db",
+) -> int:
+    with open_database(db_path) as conn:
+        return insert_search(conn, user_id, description)
+
+
+def search_exists(search_id: int, db_path: str = "resumes.db") -> bool:
+    with open_database(db_path) as conn:
+        return has_search(conn, search_id)
+
+
+def finish_search(search_id: int, db_path: str = "resumes.db"):
+    with open_database(db_path) as conn:
+        mark_search_finished(conn, search_id)
+
+
+def age_out_searches(max_age: float, db_path: str = "resumes.db") -> int:
+    with open_database(db_path) as conn:
+        return delete_old_searches(conn, max_age)
+
+
+def content_hash(resume: Resume) -> str:
+    return hashlib.sha1(repr(astuple(resume)).encode("utf-8")).hexdigest()
+
+
+def resume_rows(
+    resume: Resume,
+    resume_id: int,
+    seen_at: Optional[float] = None,
+    signature: Optional[Tuple[int, ...]] = None,
+    skill_ids: Optional[Dict[str, int]] = None,
+) -> Dict[str, List[tuple]]:
+    """
+    Rows of resume for each table in INSERT_STATEMENTS.
+
+    resume_skills rows need the ids of the resume's skills, as returned
+    by intern_skills.
+    """
+
+    if skill_ids is None:
+        skill_ids = {}
+
+    skills = ", ".join(resume.skills) if resume.skills else None
+    if signature is None:
+        signature = hasher.signature(resume_features(resume))
+
+    return {
+        "resumes": [
             (
+                resume_id,
                 resume.full_name,
                 resume.position,
                 resume.experience_years,
@@ -100,122 +640,354 @@ def save_resumes_to_db(resumes: List[Resume], db_path: str = "resumes.db"):
                 resume.salary,
                 resume.url,
                 resume.score,
-            ),
-        )
+                resume.fingerprint,
+                seen_at,
+                name_key(resume),
+                resume_key(resume.url),
+                content_hash(resume),
+            )
+        ],
+        "resume_signatures": [
+            (resume_id, band, bucket)
+            for band, bucket in hasher.band_keys(signature)
+        ],
+        "experiences": [
+            (
+                resume_id,
+                exp.position,
+                exp.company,
+                exp.company_type,
+                exp.description,
+                exp.years,
+            )
+            for exp in resume.experience or []
+        ],
+        "education": [
+            (
+                resume_id,
+                edu.name,
+                edu.type_education,
+                edu.location,
+                edu.year,
+            )
+            for edu in resume.education or []
+        ],
+        "languages": [
+            (resume_id, lang.name, lang.level)
+            for lang in resume.languages or []
+        ],
+        "resume_skills": [
+            (skill_ids[key], resume_id)
+            for key in skill_keys(resume.skills)
+            if key in skill_ids
+        ],
+        "resumes_fts": [
+            (
+                resume_id,
+                resume.full_name,
+                resume.position,
+                skills,
+                resume.details,
+                " ".join(
+                    " ".join(
+                        part
+                        for part in (exp.position, exp.company, exp.description)
+                        if part
+                    )
+                    for exp in resume.experience or []
+                ),
+                resume.location,
+            )
+        ],
+    }
 
-        resume_id = cursor.lastrowid
 
-        if resume.experience:
-            for exp in resume.experience:
-                cursor.execute(
-                    """
-                    INSERT INTO experiences (resume_id, position, company, company_type, description, years)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        resume_id,
-                        exp.position,
-                        exp.company,
-                        exp.company_type,
-                        exp.description,
-                        exp.years,
-                    ),
-                )
+def find_duplicate(
+    cursor: sqlite3.Cursor,
+    resume: Resume,
+    signature: Optional[Tuple[int, ...]] = None,
+) -> Optional[sqlite3.Row]:
+    """
+    Find a stored resume of the same candidate under another URL.
 
-        if resume.education:
-            for edu in resume.education:
-                cursor.execute(
-                    """
-                    INSERT INTO education (resume_id, name, type_education, location, year)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (
-                        resume_id,
-                        edu.name,
-                        edu.type_education,
-                        edu.location,
-                        edu.year,
-                    ),
-                )
+    Candidates have the same normalized name, looked up through an
+    index, and share an LSH bucket with resume. A match needs a MinHash
+    similarity of DUPLICATE_THRESHOLD.
+    """
 
-        if resume.languages:
-            for lang in resume.languages:
-                cursor.execute(
-                    """
-                    INSERT INTO languages (resume_id, name, level)
-                    VALUES (?, ?, ?)
-                    """,
-                    (
-                        resume_id,
-                        lang.name,
-                        lang.level,
-                    ),
-                )
+    key = name_key(resume)
+    if key is None:
+        return None
 
-    conn.commit()
-    conn.close()
+    if signature is None:
+        signature = hasher.signature(resume_features(resume))
+    band_keys = hasher.band_keys(signature)
+    if not band_keys:
+        return None
 
+    placeholders = ", ".join("(?, ?)" for _ in band_keys)
+    candidates = cursor.execute(
+        f"""
+        SELECT * FROM resumes
+        WHERE name_key = ? AND url != ?
+            AND EXISTS (
+                SELECT 1 FROM resume_signatures AS signatures
+                WHERE signatures.resume_id = resumes.id
+                    AND (signatures.band, signatures.bucket)
+                        IN (VALUES {placeholders})
+            )
+        """,
+        [key, resume.url]
+        + [value for band_key in band_keys for value in band_key],
+    ).fetchall()
+
+    for row, stored in zip(candidates, load_resumes(cursor, candidates)):
+        if hasher.similarity(
+            signature, hasher.signature(resume_features(stored))
+        ) >= DUPLICATE_THRESHOLD:
+            return row
+
+    return None
+
+
+def find_stored(
+    cursor: sqlite3.Cursor, keys: List[str]
+) -> Dict[str, sqlite3.Row]:
+    stored = {}
+    for start in range(0, len(keys), MAX_QUERY_VARIABLES):
+        part = keys[start:start + MAX_QUERY_VARIABLES]
+        placeholders = ", ".join("?" for _ in part)
+        for row in cursor.execute(
+            f"""
+            SELECT id, resume_key, content_hash FROM resumes
+            WHERE resume_key IN ({placeholders})
+            """,
+            part,
+        ):
+            stored[row[1]] = row
+    return stored
+
+
+def write_resumes(
+    conn: sqlite3.Connection,
+    resumes: List[Resume],
+    seen_at: float,
+    search_id: Optional[int] = None,
+):
+    """
+    Upsert a chunk of resumes in one transaction.
+
+    A resume is identified by its resume_key, one row per candidate URL
+    however many searches find it, so crawling it again updates the
+    stored row under the same id. When the content hash matches, only
+    its seen_at mark is refreshed. Otherwise the row is updated and its
+    child rows replaced. A new key that turns out to be a duplicate of
+    a stored resume, such as the same CV posted on the other site, is
+    merged into that record. Every resume of the chunk is linked to
+    search_id in search_resumes, with its score for per-search top-N.
+
+    Rows are written with executemany per table. The write lock is
+    taken up front, so the ids of new resumes can be allocated from
+    MAX(id) and their child rows built before anything is sent.
+    """
+
+    latest = {resume_key(resume.url): resume for resume in resumes}
 
-def get_top_resumes(
-    limit: int = 10, db_path: str = "resumes.db"
-) -> List[Resume]:
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = (
-        sqlite3.Row
-    )
     cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        stored = find_stored(cursor, list(latest))
+        hashes = {row[0]: row[2] for row in stored.values()}
+        changed: Dict[int, Resume] = {}
+        new, signatures = [], []
 
-    cursor.execute(
-        """
-        SELECT * FROM resumes
-        ORDER BY score DESC
-        LIMIT ?
-    """,
-        (limit,),
-    )
-    resume_rows = cursor.fetchall()
+        for key, resume in latest.items():
+            row = stored.get(key)
+            if row is not None:
+                if row[0] in changed:
+                    resume = merge_resumes(resume, changed[row[0]])
+                changed[row[0]] = resume
+                continue
 
-    resumes = []
-    for row in resume_rows:
-        cursor.execute(
-            "SELECT * FROM experiences WHERE resume_id = ?", (row["id"],)
-        )
-        experience_rows = cursor.fetchall()
-        experiences = [
-            Experience(
-                position=exp["position"],
-                company=exp["company"],
-                company_type=exp["company_type"],
-                description=exp["description"],
-                years=exp["years"],
+            signature = hasher.signature(resume_features(resume))
+            duplicate = find_duplicate(cursor, resume, signature)
+            if duplicate is None:
+                new.append(resume)
+                signatures.append(signature)
+                continue
+
+            hashes[duplicate["id"]] = duplicate["content_hash"]
+            canonical = changed.get(duplicate["id"]) or load_resume(
+                cursor, duplicate
             )
-            for exp in experience_rows
-        ]
+            changed[duplicate["id"]] = merge_resumes(canonical, resume)
 
-        cursor.execute(
-            "SELECT * FROM education WHERE resume_id = ?", (row["id"],)
-        )
-        education_rows = cursor.fetchall()
-        educations = [
-            Education(
-                name=edu["name"],
-                type_education=edu["type_education"],
-                location=edu["location"],
-                year=edu["year"],
+        first_id = cursor.execute(
+            "SELECT COALESCE(MAX(id), 0) + 1 FROM resumes"
+        ).fetchone()[0]
+        links = [
+            (search_id, resume_id, resume.score, seen_at)
+            for resume_id, resume in itertools.chain(
+                changed.items(), zip(itertools.count(first_id), new)
             )
-            for edu in education_rows
         ]
 
-        cursor.execute(
-            "SELECT * FROM languages WHERE resume_id = ?", (row["id"],)
-        )
-        language_rows = cursor.fetchall()
-        languages = [
-            Language(name=lang["name"], level=lang["level"])
-            for lang in language_rows
+        touched = [
+            (seen_at, resume_id)
+            for resume_id, resume in changed.items()
+            if content_hash(resume) == hashes[resume_id]
         ]
+        for _, resume_id in touched:
+            del changed[resume_id]
+
+        cursor.executemany(
+            "UPDATE resumes SET seen_at = ? WHERE id = ?", touched
+        )
+        delete_children(cursor, list(changed))
+        cursor.executemany(
+            "UPDATE search_resumes SET score = ? WHERE resume_id = ?",
+            [(resume.score, resume_id) for resume_id, resume in changed.items()],
+        )
+
+        skill_ids = intern_skills(
+            cursor,
+            (
+                key
+                for resume in itertools.chain(changed.values(), new)
+                for key in skill_keys(resume.skills)
+            ),
+        )
+        rows = defaultdict(list)
+        for resume_id, resume, signature in itertools.chain(
+            ((resume_id, resume, None) for resume_id, resume in changed.items()),
+            zip(itertools.count(first_id), new, signatures),
+        ):
+            for table, table_rows in resume_rows(
+                resume, resume_id, seen_at, signature, skill_ids
+            ).items():
+                rows[table].extend(table_rows)
+
+        for table, statement in INSERT_STATEMENTS.items():
+            if rows[table]:
+                cursor.executemany(statement, rows[table])
+        if search_id is not None:
+            cursor.executemany(LINK_STATEMENT, links)
+
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def save_in_chunks(
+    resumes: Iterable[Resume],
+    write: Callable[[List[Resume]], None],
+    commit_every: int = 500,
+    commit_interval: float = 1.0,
+) -> int:
+    """
+    Pass resumes to write in chunks, return how many were passed.
 
-        resume = Resume(
+    A chunk is full at commit_every resumes, or once commit_interval
+    seconds have passed since its first resume, so memory stays
+    constant and a crawl that dies halfway keeps what it has saved.
+    The last, partial chunk is written even when resumes raises.
+    """
+
+    saved = 0
+    chunk: List[Resume] = []
+    chunk_started = time.monotonic()
+    try:
+        for resume in resumes:
+            if not chunk:
+                chunk_started = time.monotonic()
+            chunk.append(resume)
+            saved += 1
+
+            if (
+                len(chunk) >= commit_every
+                or time.monotonic() - chunk_started >= commit_interval
+            ):
+                chunk, full = [], chunk
+                write(full)
+    finally:
+        if chunk:
+            write(chunk)
+
+    return saved
+
+
+def save_resumes_to_db(
+    resumes: Iterable[Resume],
+    db_path: str = "resumes.db",
+    commit_every: int = 500,
+    clear: bool = True,
+    seen_at: Optional[float] = None,
+    search_id: Optional[int] = None,
+    commit_interval: float = 1.0,
+) -> int:
+    """
+    Save resumes as they arrive from an iterable such as iter_resumes.
+
+    Resumes are upserted by write_resumes in chunks from save_in_chunks,
+    so no transaction is held open while the crawl waits on the
+    network. With clear=False the table is kept, which is what
+    incremental and resumed crawls need. Resumes are linked to
+    search_id, clearing only unlinks that search's resumes, so searches
+    of other users are left alone.
+    """
+
+    if seen_at is None:
+        seen_at = time.time()
+
+    with open_database(db_path) as conn:
+        if clear:
+            clear_search(conn, search_id)
+        return save_in_chunks(
+            resumes,
+            lambda chunk: write_resumes(conn, chunk, seen_at, search_id),
+            commit_every,
+            commit_interval,
+        )
+
+
+def load_children(
+    cursor: sqlite3.Cursor, table: str, resume_ids: List[int]
+) -> Dict[int, List[sqlite3.Row]]:
+    """Rows of a child table for all resume_ids, grouped by resume."""
+
+    children = defaultdict(list)
+    for start in range(0, len(resume_ids), MAX_QUERY_VARIABLES):
+        part = resume_ids[start:start + MAX_QUERY_VARIABLES]
+        placeholders = ", ".join("?" for _ in part)
+        for child in cursor.execute(
+            f"""
+            SELECT * FROM {table}
+            WHERE resume_id IN ({placeholders})
+            ORDER BY resume_id, id
+            """,
+            part,
+        ):
+            children[child["resume_id"]].append(child)
+    return children
+
+
+def load_resumes(
+    cursor: sqlite3.Cursor, rows: List[sqlite3.Row]
+) -> List[Resume]:
+    """
+    Build resumes from their rows with one query per child table.
+
+    The cursor's connection must use sqlite3.Row as its row factory.
+    """
+
+    resume_ids = [row["id"] for row in rows]
+    experiences = load_children(cursor, "experiences", resume_ids)
+    education = load_children(cursor, "education", resume_ids)
+    languages = load_children(cursor, "languages", resume_ids)
+
+    return [
+        Resume(
             full_name=row["full_name"],
             position=row["position"],
             experience_years=row["experience_years"],
@@ -225,11 +997,302 @@ def get_top_resumes(
             salary=row["salary"],
             url=row["url"],
             score=row["score"],
-            experience=experiences,
-            education=educations,
-            languages=languages,
+            fingerprint=row["fingerprint"],
+            experience=[
+                Experience(
+                    position=exp["position"],
+                    company=exp["company"],
+                    company_type=exp["company_type"],
+                    description=exp["description"],
+                    years=exp["years"],
+                )
+                for exp in experiences[row["id"]]
+            ],
+            education=[
+                Education(
+                    name=edu["name"],
+                    type_education=edu["type_education"],
+                    location=edu["location"],
+                    year=edu["year"],
+                )
+                for edu in education[row["id"]]
+            ],
+            languages=[
+                Language(name=lang["name"], level=lang["level"])
+                for lang in languages[row["id"]]
+            ],
+        )
+        for row in rows
+    ]
+
+
+def load_resume(cursor: sqlite3.Cursor, row: sqlite3.Row) -> Resume:
+    return load_resumes(cursor, [row])[0]
+
+
+def select_top_resumes(
+    conn: sqlite3.Connection,
+    limit: int = 10,
+    seen_since: Optional[float] = None,
+    search_id: Optional[int] = None,
+) -> List[Resume]:
+    """
+    The best resumes of search_id, or of every search, by score.
+
+    Only the filters that are given go into the WHERE clause, an
+    "? IS NULL OR" filter would keep SQLite from reading the rows in
+    score order from an index. A search's resumes are read through its
+    links, in the order of their (search_id, score) index.
+    """
+
+    if search_id is None:
+        source, ranked = "resumes", "resumes"
+        conditions, params = [], []
+    else:
+        source = (
+            "search_resumes AS link "
+            "JOIN resumes ON resumes.id = link.resume_id"
         )
-        resumes.append(resume)
+        ranked = "link"
+        conditions, params = ["link.search_id = ?"], [search_id]
+    if seen_since is not None:
+        conditions.append(f"{ranked}.seen_at >= ?")
+        params.append(seen_since)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT resumes.* FROM {source}
+        {where}
+        ORDER BY {ranked}.score DESC
+        LIMIT ?
+        """,
+        params + [limit],
+    )
+    return load_resumes(cursor, cursor.fetchall())
+
+
+def select_known_resumes(
+    conn: sqlite3.Connection, urls: List[str]
+) -> Dict[str, Resume]:
+    """
+    Return the stored resumes with a fingerprint, keyed by the URLs.
+
+    Rows are looked up by the resume_key of each URL, so a card URL that
+    differs from the stored one only in its query or host form matches.
+    """
+
+    if not urls:
+        return {}
+
+    keys = {url: resume_key(url) for url in urls}
+    distinct_keys = list(dict.fromkeys(keys.values()))
+    placeholders = ", ".join("?" for _ in distinct_keys)
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT * FROM resumes
+        WHERE resume_key IN ({placeholders}) AND fingerprint IS NOT NULL
+        """,
+        distinct_keys,
+    )
+    rows = cursor.fetchall()
+    stored = {
+        row["resume_key"]: resume
+        for row, resume in zip(rows, load_resumes(cursor, rows))
+    }
+    return {url: stored[key] for url, key in keys.items() if key in stored}
+
+
+def select_stored_resume(
+    conn: sqlite3.Connection, url: str, search_id: Optional[int] = None
+) -> Optional[Resume]:
+    """
+    The resume stored under the resume key of url, if search_id is
+    given only when that search found it.
+    """
+
+    cursor = conn.cursor()
+    if search_id is None:
+        rows = cursor.execute(
+            "SELECT * FROM resumes WHERE resume_key = ?", (resume_key(url),)
+        ).fetchall()
+    else:
+        rows = cursor.execute(
+            """
+            SELECT resumes.* FROM resumes
+            JOIN search_resumes AS link ON link.resume_id = resumes.id
+            WHERE resumes.resume_key = ? AND link.search_id = ?
+            """,
+            (resume_key(url), search_id),
+        ).fetchall()
+    return load_resume(cursor, rows[0]) if rows else None
+
+
+def get_top_resumes(
+    limit: int = 10,
+    db_path: str = "resumes.db",
+    seen_since: Optional[float] = None,
+    search_id: Optional[int] = None,
+) -> List[Resume]:
+    with open_database(db_path) as conn:
+        return select_top_resumes(conn, limit, seen_since, search_id)
+
+
+def get_known_resumes(
+    urls: List[str], db_path: str = "resumes.db"
+) -> Dict[str, Resume]:
+    if not urls:
+        return {}
+
+    with open_database(db_path) as conn:
+        return select_known_resumes(conn, urls)
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    FTS5 query matching every word of text as a prefix.
+
+    Words are quoted, so operators and punctuation typed by the user
+    can't break the query syntax.
+    """
 
-    conn.close()
-    return resumes
+    words = normalize(text)
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def select_search_hits(
+    conn: sqlite3.Connection, query: str, limit: int = 10
+) -> List[Tuple[Resume, str]]:
+    """
+    Full-text search over every stored resume, best BM25 match first.
+
+    Each resume comes with a snippet of its best matching column, the
+    matched words wrapped in SNIPPET_START and SNIPPET_END.
+    """
+
+    match = fts_query(query)
+    if match is None:
+        return []
+
+    cursor = conn.cursor()
+
+    resume_ids = [
+        row[0]
+        for row in cursor.execute(
+            """
+            SELECT rowid FROM resumes_fts
+            WHERE resumes_fts MATCH ?
+            ORDER BY bm25(resumes_fts, 2.0, 3.0, 3.0, 1.0, 1.0, 2.0)
+            LIMIT ?
+            """,
+            (match, limit),
+        )
+    ]
+
+    placeholders = ", ".join("?" for _ in resume_ids)
+    snippets = dict(
+        cursor.execute(
+            f"""
+            SELECT rowid, snippet(resumes_fts, -1, ?, ?, '…', 16)
+            FROM resumes_fts
+            WHERE resumes_fts MATCH ? AND rowid IN ({placeholders})
+            """,
+            [SNIPPET_START, SNIPPET_END, match] + resume_ids,
+        ).fetchall()
+    )
+    rows = {
+        row["id"]: row
+        for row in cursor.execute(
+            f"SELECT * FROM resumes WHERE id IN ({placeholders})",
+            resume_ids,
+        )
+    }
+    resumes = load_resumes(cursor, [rows[id] for id in resume_ids])
+
+    return [
+        (resume, snippets[resume_id])
+        for resume_id, resume in zip(resume_ids, resumes)
+    ]
+
+
+def select_resumes_by_skills(
+    conn: sqlite3.Connection,
+    skills: Iterable[str],
+    match_all: bool = True,
+    limit: int = 10,
+    search_id: Optional[int] = None,
+) -> List[Resume]:
+    """
+    Resumes with all, or with any, of skills, best score first.
+
+    Skills are folded like stored ones, so synonyms match. The posting
+    lists of the skills are intersected, or united, through the
+    resume_skills primary key. Without search_id every stored resume
+    is queried.
+    """
+
+    keys = skill_keys(skills)
+    if not keys:
+        return []
+
+    cursor = conn.cursor()
+
+    placeholders = ", ".join("?" for _ in keys)
+    skill_ids = [
+        row[0]
+        for row in cursor.execute(
+            f"SELECT id FROM skills WHERE name IN ({placeholders})", keys
+        )
+    ]
+    if not skill_ids or (match_all and len(skill_ids) < len(keys)):
+        return []
+
+    postings = (" INTERSECT " if match_all else " UNION ").join(
+        "SELECT resume_id FROM resume_skills WHERE skill_id = ?"
+        for _ in skill_ids
+    )
+    if search_id is None:
+        cursor.execute(
+            f"""
+            SELECT * FROM resumes
+            WHERE id IN ({postings})
+            ORDER BY score DESC
+            LIMIT ?
+            """,
+            skill_ids + [limit],
+        )
+    else:
+        cursor.execute(
+            f"""
+            SELECT resumes.* FROM search_resumes AS link
+            JOIN resumes ON resumes.id = link.resume_id
+            WHERE link.search_id = ? AND link.resume_id IN ({postings})
+            ORDER BY link.score DESC
+            LIMIT ?
+            """,
+            [search_id] + skill_ids + [limit],
+        )
+    return load_resumes(cursor, cursor.fetchall())
+
+
+def search_resumes(
+    query: str, limit: int = 10, db_path: str = "resumes.db"
+) -> List[Tuple[Resume, str]]:
+    with open_database(db_path) as conn:
+        return select_search_hits(conn, query, limit)
+
+
+def find_resumes_by_skills(
+    skills: Iterable[str],
+    match_all: bool = True,
+    limit: int = 10,
+    search_id: Optional[int] = None,
+    db_path: str = "resumes.db",
+) -> List[Resume]:
+    with open_database(db_path) as conn:
+        return select_resumes_by_skills(
+            conn, skills, match_all, limit, search_id
+        )
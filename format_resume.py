@@ -1,3 +1,6 @@
+import html
+
+from db import SNIPPET_END, SNIPPET_START
 from parser.resume_types import Resume
 
 
@@ -36,3 +39,13 @@ def format_resume(resume: Resume) -> str:
 
     formatted += f"URL: {resume.url}\n"
     return formatted
+
+
+def format_snippet(snippet: str) -> str:
+    """Escape a search snippet for HTML and bold the matched words."""
+
+    return (
+        html.escape(snippet)
+        .replace(SNIPPET_START, "<b>")
+        .replace(SNIPPET_END, "</b>")
+    )
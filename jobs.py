@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: int
+    user_id: int
+    description: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class JobLimitExceeded(Exception):
+    pass
+
+
+class JobManager:
+    """
+    Runs blocking crawls on a thread pool so the event loop stays free.
+
+    max_workers is the global number of crawls running at once, extra
+    jobs wait in the executor queue. max_jobs_per_user caps queued and
+    running jobs of a single user. Once its results are posted, a
+    finished job is only kept among the last keep_finished of its user,
+    so /jobs shows recent history without the list growing forever.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_jobs_per_user: int = 1,
+        keep_finished: int = 5,
+    ):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="crawl-job"
+        )
+        self.max_jobs_per_user = max_jobs_per_user
+        self.keep_finished = keep_finished
+        self.jobs: Dict[int, Job] = {}
+        self.active_per_user: Dict[int, int] = defaultdict(int)
+        self.ids = itertools.count(1)
+        self.tasks: Set[asyncio.Task] = set()
+
+    def submit(
+        self,
+        user_id: int,
+        description: str,
+        func: Callable[..., Any],
+        *args,
+        on_done: Optional[Callable[[Job], Awaitable[None]]] = None,
+    ) -> Job:
+        if self.active_per_user[user_id] >= self.max_jobs_per_user:
+            raise JobLimitExceeded(
+                f"User {user_id} already has "
+                f"{self.active_per_user[user_id]} active job(s)"
+            )
+
+        job = Job(id=next(self.ids), user_id=user_id, description=description)
+        self.jobs[job.id] = job
+        self.active_per_user[user_id] += 1
+
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, self.run, job, func, args
+        )
+        task = asyncio.create_task(self.finish(job, future, on_done))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        return job
+
+    @staticmethod
+    def run(job: Job, func: Callable[..., Any], args: tuple) -> Any:
+        job.status = JobStatus.RUNNING
+        job.started_at = time.monotonic()
+        return func(*args)
+
+    async def finish(
+        self,
+        job: Job,
+        future: asyncio.Future,
+        on_done: Optional[Callable[[Job], Awaitable[None]]],
+    ) -> None:
+        try:
+            job.result = await future
+            job.status = JobStatus.DONE
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {e}")
+            job.error = e
+            job.status = JobStatus.FAILED
+        finally:
+            job.finished_at = time.monotonic()
+            self.active_per_user[job.user_id] -= 1
+            if not self.active_per_user[job.user_id]:
+                del self.active_per_user[job.user_id]
+
+        if on_done:
+            try:
+                await on_done(job)
+            except Exception as e:
+                logging.error(f"Error in callback of job {job.id}: {e}")
+
+        job.result = None
+        self.prune(job.user_id)
+
+    def prune(self, user_id: int) -> None:
+        """Forget all but the last keep_finished finished jobs of user_id."""
+
+        finished = [
+            job
+            for job in self.get_user_jobs(user_id)
+            if not job.is_active and job.result is None
+        ]
+        for job in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self.jobs[job.id]
+
+    def get_user_jobs(self, user_id: int) -> List[Job]:
+        return [job for job in self.jobs.values() if job.user_id == user_id]
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
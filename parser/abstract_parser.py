@@ -1,31 +1,707 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import queue
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from dataclasses import replace
+from contextlib import closing, contextmanager, nullcontext
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
 
 from selenium import webdriver
 from selenium.common import (
     NoSuchElementException,
     StaleElementReferenceException,
+    TimeoutException,
 )
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 
-from parser.resume_types import Resume, Language, Experience, Education
+from parser.browser_service import BrowserService
+from parser.checkpoint import CrawlState, CrawlStateStore
+from parser.driver_pool import DriverPool
+from parser.frontier import CrawlFrontier
+from parser.html_cache import CacheMiss, HtmlCache
+from parser.http_client import is_throttled_page
+from parser.scheduler import FetchTicket, PolitenessScheduler, Throttled
+from parser.ranking import TopKRanker
+from parser.relevance import (
+    calculate_card_score,
+    calculate_resume_score,
+    card_priority,
+    card_score_upper_bound,
+)
+from parser.resume_types import (
+    Resume,
+    Language,
+    Experience,
+    Education,
+    ListingPage,
+    ResumeCard,
+)
+from parser.utils import ExtractionMode
+
+CAPTCHA_LOCATOR = (
+    By.CSS_SELECTOR,
+    ".g-recaptcha, .h-captcha, #cf-challenge-running, #captcha-form, "
+    "iframe[src*='captcha']",
+)
 
 
 class AbstractResumeParser(ABC):
+    SITE: Optional[str] = None
+    THROTTLE_RETRIES = 2
+
+    def __init__(
+        self,
+        workers: int = 1,
+        extraction_mode: ExtractionMode = ExtractionMode.SNAPSHOT,
+        prefetch_pages: int = 0,
+        cache: Optional[HtmlCache] = None,
+        scheduler: Optional[PolitenessScheduler] = None,
+        checkpoints: Optional[CrawlStateStore] = None,
+        known_resumes: Optional[
+            Callable[[List[str]], Dict[str, Resume]]
+        ] = None,
+        detail_top_k: Optional[int] = None,
+        detail_min_score: Optional[float] = None,
+        frontier_lookahead: int = 0,
+        browsers: Optional[BrowserService] = None,
+    ):
+        self._driver = None
+        self._pool = None
+        self._local = threading.local()
+        self.workers = workers
+        self.extraction_mode = extraction_mode
+        self.prefetch_pages = prefetch_pages
+        self.cache = cache
+        self.scheduler = scheduler
+        self.checkpoints = checkpoints
+        self.known_resumes = known_resumes
+        self.detail_top_k = detail_top_k
+        self.detail_min_score = detail_min_score
+        self.frontier_lookahead = frontier_lookahead
+        self.browsers = browsers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def driver(self) -> webdriver.Chrome:
+        local_driver = getattr(self._local, "driver", None)
+        if local_driver is not None:
+            return local_driver
+
+        if getattr(self._local, "in_pool", False):
+            self._local.driver = self.pool.acquire()
+            return self._local.driver
+
+        if self._driver is None:
+            self._driver = self.create_driver()
+        return self._driver
+
+    @property
+    def pool(self) -> DriverPool:
+        if self._pool is None:
+            self._pool = DriverPool(
+                self.workers, self.create_driver, self.release_driver
+            )
+        return self._pool
+
+    @classmethod
+    def create_browser(cls) -> webdriver.Chrome:
+        """Start a browser ready for this site, used by BrowserService."""
 
-    def __init__(self):
         chrome_options = Options()
         chrome_options.add_argument("--headless")
-        self.driver = webdriver.Chrome(
+        return webdriver.Chrome(
             service=ChromeService(), options=chrome_options
         )
 
-    @abstractmethod
+    def create_driver(self) -> webdriver.Chrome:
+        if self.browsers is not None:
+            return self.browsers.acquire(self.SITE)
+        return self.create_browser()
+
+    def recycle_driver(self) -> None:
+        """Replace the browser this thread uses with a fresh one."""
+
+        local_driver = getattr(self._local, "driver", None)
+        if local_driver is not None:
+            self._local.driver = self.pool.replace(local_driver)
+            return
+
+        if self._driver is not None:
+            self.release_driver(self._driver)
+            self._driver = self.create_driver()
+
+    def release_driver(self, driver: webdriver.Chrome) -> None:
+        if self.browsers is not None:
+            self.browsers.release(self.SITE, driver)
+        else:
+            driver.quit()
+
+    def open_page(self, url: str, locator: tuple, timeout: float) -> None:
+        """
+        Load url in the browser and wait until locator is present.
+
+        The load goes through the politeness scheduler when there is one,
+        a timeout counts as a failed fetch for its backoff controller. A
+        captcha or 429 page counts as a throttled fetch and is loaded
+        again once the backoff has passed, Throttled is raised when the
+        last retry is throttled too.
+        """
+
+        attempts = self.THROTTLE_RETRIES + 1 if self.scheduler else 1
+        for _ in range(attempts):
+            if self.load_page(url, locator, timeout):
+                return
+
+        raise Throttled(url)
+
+    def load_page(self, url: str, locator: tuple, timeout: float) -> bool:
+        """Load url once, return False if the page was throttled."""
+
+        request = (
+            self.scheduler.request(url)
+            if self.scheduler
+            else nullcontext(FetchTicket())
+        )
+
+        if self.browsers is not None and self.browsers.should_recycle(
+            self.driver
+        ):
+            self.recycle_driver()
+
+        with request as ticket:
+            self.driver.get(url)
+            if self.browsers is not None:
+                self.browsers.record_page(self.driver)
+
+            try:
+                WebDriverWait(self.driver, timeout).until(
+                    EC.any_of(
+                        EC.presence_of_element_located(locator),
+                        EC.presence_of_element_located(CAPTCHA_LOCATOR),
+                    )
+                )
+            except TimeoutException:
+                if not is_throttled_page(self.driver.page_source):
+                    raise
+            else:
+                if not self.driver.find_elements(*CAPTCHA_LOCATOR):
+                    return True
+
+            ticket.throttle()
+            logging.error(f"Throttled page loaded in the browser: {url}")
+            return False
+
+    def extract_snapshot(self, extract: Callable, url: str):
+        """
+        Run an offline extractor over the current page source.
+
+        The whole DOM is fetched from chromedriver in one round trip,
+        so extraction cost no longer depends on the number of fields.
+        """
+
+        html = self.driver.page_source
+
+        try:
+            result = extract(html, url)
+        except Exception as e:
+            logging.error(f"Error extracting page snapshot {url}: {e}")
+            return None
+
+        if result is not None:
+            self.store_page(url, html)
+        return result
+
+    def extract_from_cache(self, url: str, extract: Callable):
+        """
+        Run an offline extractor over the cached HTML of url.
+
+        Returns None on a miss so the caller goes to the network. In
+        replay-only mode a miss raises CacheMiss instead.
+        """
+
+        if self.cache is None:
+            return None
+
+        html = self.cache.get(url)
+        result = None
+
+        if html is not None:
+            try:
+                result = extract(html, url)
+            except Exception as e:
+                logging.error(f"Error extracting cached page {url}: {e}")
+
+        if result is None and self.cache.replay_only:
+            raise CacheMiss(url)
+
+        return result
+
+    def store_page(self, url: str, html: str) -> None:
+        if self.cache is not None:
+            self.cache.put(url, html)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+        if self._driver is not None:
+            self.release_driver(self._driver)
+            self._driver = None
+
+    @contextmanager
+    def pooled_driver(self):
+        """
+        Make self.driver lease a browser from the pool in this thread.
+
+        The browser is only acquired if the code inside actually uses
+        self.driver, and goes back to the pool on exit.
+        """
+
+        self._local.in_pool = True
+        try:
+            yield
+        finally:
+            self._local.in_pool = False
+            driver = self._local.__dict__.pop("driver", None)
+            if driver is not None:
+                self.pool.release(driver)
+
+    def fetch_resume(self, url: str) -> Optional[Resume]:
+        """
+        parse_single_resume, skipping a resume that stays throttled or
+        fails to load, so one broken page doesn't end the crawl.
+
+        The skipped resume isn't checkpointed, a resumed crawl fetches it.
+        """
+
+        try:
+            return self.parse_single_resume(url)
+        except Throttled as e:
+            logging.error(f"Skipping resume: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Error parsing resume {url}: {e}")
+            return None
+
+    def parse_resume_in_pool(self, url: str) -> Optional[Resume]:
+        with self.pooled_driver():
+            return self.fetch_resume(url)
+
+    def parse_resume_links(self, resume_links: List[str]) -> List[Resume]:
+        if self.workers > 1 and len(resume_links) > 1:
+            parsed = self.pool.map(self.parse_resume_in_pool, resume_links)
+        else:
+            parsed = [self.fetch_resume(link) for link in resume_links]
+
+        resumes = []
+        for resume in parsed:
+            if resume:
+                resume.score = calculate_resume_score(resume)
+                resumes.append(resume)
+
+        return resumes
+
+    def parse_cards(self, cards: List[ResumeCard]) -> List[Resume]:
+        """
+        Parse the resumes behind listing cards.
+
+        With a known_resumes lookup the crawl is incremental: a card
+        whose fingerprint matches the stored resume is served from the
+        store and only new or changed resumes are fetched.
+        """
+
+        known = (
+            self.known_resumes([card.url for card in cards])
+            if self.known_resumes and cards
+            else {}
+        )
+
+        resumes = []
+        fresh_cards = []
+        for card in cards:
+            stored = known.get(card.url)
+            if (
+                stored is not None
+                and card.fingerprint is not None
+                and stored.fingerprint == card.fingerprint
+            ):
+                resumes.append(stored)
+            else:
+                fresh_cards.append(card)
+
+        if resumes:
+            logging.info(
+                f"Reused {len(resumes)} unchanged resumes, "
+                f"fetching {len(fresh_cards)}"
+            )
+
+        fingerprints = {card.url: card.fingerprint for card in fresh_cards}
+        for resume in self.parse_resume_links(list(fingerprints)):
+            resume.fingerprint = fingerprints.get(resume.url)
+            resumes.append(resume)
+
+        return resumes
+
+    def prefilter_cards(self, cards: List[ResumeCard]) -> List[ResumeCard]:
+        """
+        Drop cards whose provisional score is below detail_min_score.
+
+        Cards without a preview are kept, they can only be judged after
+        the detail page is fetched.
+        """
+
+        if self.detail_min_score is None:
+            return cards
+
+        return [
+            card
+            for card in cards
+            if (score := calculate_card_score(card)) is None
+            or score >= self.detail_min_score
+        ]
+
+    def iter_card_resumes(
+        self, cards: List[ResumeCard], ranker: Optional[TopKRanker] = None
+    ) -> Iterator[Resume]:
+        """
+        Parse the resumes behind cards, feeding them into ranker.
+
+        With a ranker the cards are fetched a few at a time, so the
+        crawl stops soon after the time budget runs out, and a card is
+        skipped once its score upper bound can't beat the k-th best.
+        """
+
+        if ranker is None:
+            yield from self.parse_cards(cards)
+            return
+
+        chunk_size = max(self.workers, 1)
+        for start in range(0, len(cards), chunk_size):
+            if ranker.expired():
+                return
+
+            chunk = [
+                card
+                for card in cards[start:start + chunk_size]
+                if ranker.can_improve(card_score_upper_bound(card))
+            ]
+
+            for resume in self.parse_cards(chunk):
+                ranker.add(resume)
+                yield resume
+
+    def iter_top_cards(
+        self,
+        url: str,
+        ranker: Optional[TopKRanker] = None,
+        keywords: Iterable[str] = (),
+        state: Optional[CrawlState] = None,
+    ) -> Iterator[Resume]:
+        """
+        Two-phase crawl: rank the listing cards, then fetch the best.
+
+        Listing pages are cheap next to detail pages, so the listing is
+        walked first and only the detail_top_k cards with the highest
+        provisional score are fetched. The walk stops at the ranker's
+        page or time budget, or once detail_top_k cards are selected and
+        a whole page adds none that beats the current k-th card.
+
+        The checkpoint is only finished once the walk wasn't cut short by
+        a listing error and every selected card is done or was dropped
+        by the ranker, so a resumed crawl fetches the resumes that failed.
+        """
+
+        top = []
+        counter = itertools.count()
+        seen = 0
+        page = None
+        with closing(
+            self.iter_listing_pages(url, self.prefetch_pages)
+        ) as pages:
+            for page in pages:
+                improved = False
+                for card in self.prefilter_cards(page.cards):
+                    seen += 1
+                    priority = card_priority(card, keywords)
+                    item = (priority, -next(counter), card)
+                    if len(top) < self.detail_top_k:
+                        heapq.heappush(top, item)
+                    elif item > top[0]:
+                        heapq.heapreplace(top, item)
+                    else:
+                        continue
+                    improved = True
+
+                if ranker is not None and ranker.page_done():
+                    complete = page.next_url is None
+                    break
+                if not improved and len(top) >= self.detail_top_k:
+                    complete = True
+                    break
+            else:
+                complete = page is not None and page.next_url is None
+
+        selected = [card for _, _, card in sorted(top, reverse=True)]
+        logging.info(
+            f"Fetching {len(selected)} of {seen} resumes after "
+            f"the listing prefilter"
+        )
+
+        if state is not None:
+            selected = [
+                card for card in selected if card.url not in state.done_resumes
+            ]
+
+        for resume in self.iter_card_resumes(selected, ranker):
+            yield resume
+            if state is not None:
+                self.checkpoints.resume_done(state, resume.url)
+
+        if ranker is not None and ranker.expired():
+            complete = False
+
+        if state is not None and complete and not any(
+            card.url not in state.done_resumes
+            and (
+                ranker is None
+                or ranker.can_improve(card_score_upper_bound(card))
+            )
+            for card in selected
+        ):
+            self.checkpoints.finish(state)
+
+    def filter_pages(
+        self,
+        pages: Iterator[ListingPage],
+        state: Optional[CrawlState] = None,
+        ranker: Optional[TopKRanker] = None,
+    ) -> Iterator[ListingPage]:
+        for page in pages:
+            yield replace(
+                page,
+                cards=[
+                    card
+                    for card in self.prefilter_cards(page.cards)
+                    if state is None or card.url not in state.done_resumes
+                ],
+            )
+            if ranker is not None and ranker.page_done():
+                return
+
+    def iter_frontier(
+        self,
+        url: str,
+        ranker: Optional[TopKRanker] = None,
+        keywords: Iterable[str] = (),
+        state: Optional[CrawlState] = None,
+    ) -> Iterator[Resume]:
+        """
+        Crawl in order of predicted score instead of listing order.
+
+        Cards from frontier_lookahead listing pages compete in a
+        CrawlFrontier, so the top results converge within the first
+        fetches and a time-limited crawl keeps the best candidates.
+        """
+
+        start_url = state.next_url if state else url
+
+        if start_url:
+            with closing(
+                self.iter_listing_pages(start_url, self.prefetch_pages)
+            ) as pages:
+                frontier = CrawlFrontier(
+                    self.filter_pages(pages, state, ranker),
+                    lookahead=self.frontier_lookahead,
+                    keywords=keywords,
+                )
+
+                while cards := frontier.pop(max(self.workers, 1)):
+                    for resume in self.iter_card_resumes(cards, ranker):
+                        yield resume
+                        if state is not None:
+                            self.checkpoints.resume_done(state, resume.url)
+
+                    if ranker is not None and ranker.expired():
+                        return
+
+                    if state is not None:
+                        for page in frontier.completed_pages():
+                            self.checkpoints.page_done(
+                                state, page.url, page.next_url
+                            )
+
+        if state is not None and state.next_url is None:
+            self.checkpoints.finish(state)
+
     def get_next_page_url(self, url: str) -> Optional[str]:
-        pass
+        return self.parse_listing_page(url).next_url
+
+    def iter_listing_pages(
+        self, url: str, prefetch: int = 0
+    ) -> Iterator[ListingPage]:
+        """
+        Walk the listing pages starting from url.
+
+        Each listing page is loaded once, the next page link is read
+        from the same load. With prefetch > 0 a background thread walks
+        up to prefetch pages ahead, so listing traversal overlaps with
+        fetching the resumes of the current page.
+        """
+
+        if prefetch <= 0:
+            while url:
+                try:
+                    page = self.parse_listing_page(url)
+                except Exception as e:
+                    logging.error(f"Error parsing listing page {url}: {e}")
+                    return
+
+                if page is None:
+                    return
+
+                yield page
+                url = page.next_url
+            return
+
+        pages = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce(next_url: Optional[str]) -> None:
+            try:
+                with self.pooled_driver():
+                    for page in self.iter_listing_pages(next_url):
+                        if not put(page):
+                            return
+            finally:
+                put(None)
+
+        producer = threading.Thread(
+            target=produce, args=(url,), name="listing-prefetch", daemon=True
+        )
+        producer.start()
+
+        try:
+            while (page := pages.get()) is not None:
+                yield page
+        finally:
+            stop.set()
+            producer.join()
+
+    def iter_crawl(
+        self,
+        url: str,
+        ranker: Optional[TopKRanker] = None,
+        keywords: Iterable[str] = (),
+        search_id: Optional[int] = None,
+    ) -> Iterator[Resume]:
+        """
+        Crawl the listing starting from url and yield its resumes.
+
+        With a ranker the crawl keeps the best-so-far resumes in it and
+        stops early when the ranker's page or time budget runs out.
+        Keywords from the search raise the priority of matching cards
+        in the two-phase and frontier crawls. With checkpoints the crawl
+        of search_id is claimed while it runs, so no other job resumes
+        it at the same time.
+        """
+
+        state = (
+            self.checkpoints.start(url, search_id)
+            if self.checkpoints
+            else None
+        )
+        try:
+            if self.detail_top_k:
+                yield from self.iter_top_cards(url, ranker, keywords, state)
+            elif self.frontier_lookahead > 0:
+                yield from self.iter_frontier(url, ranker, keywords, state)
+            else:
+                yield from self.iter_pages(url, ranker, state)
+        finally:
+            if state is not None:
+                self.checkpoints.release(state)
+
+    def iter_pages(
+        self,
+        url: str,
+        ranker: Optional[TopKRanker] = None,
+        state: Optional[CrawlState] = None,
+    ) -> Iterator[Resume]:
+        """Crawl the listing page by page, in listing order."""
+
+        if state is None:
+            with closing(
+                self.iter_listing_pages(url, self.prefetch_pages)
+            ) as pages:
+                for page in pages:
+                    yield from self.iter_card_resumes(
+                        self.prefilter_cards(page.cards), ranker
+                    )
+                    if ranker is not None and ranker.page_done():
+                        return
+            return
+
+        if state.next_url != url:
+            logging.info(f"Resuming crawl {state.id} from {state.next_url}")
+
+        if state.next_url:
+            with closing(
+                self.iter_listing_pages(state.next_url, self.prefetch_pages)
+            ) as pages:
+                for page in pages:
+                    cards = [
+                        card
+                        for card in self.prefilter_cards(page.cards)
+                        if card.url not in state.done_resumes
+                    ]
+
+                    for resume in self.iter_card_resumes(cards, ranker):
+                        yield resume
+                        self.checkpoints.resume_done(state, resume.url)
+
+                    if ranker is not None and ranker.expired():
+                        return
+
+                    self.checkpoints.page_done(state, page.url, page.next_url)
+                    if ranker is not None and ranker.page_done():
+                        break
+
+        if state.next_url is None:
+            self.checkpoints.finish(state)
+
+    def crawl(self, url: str) -> List[Resume]:
+        return list(self.iter_crawl(url))
 
     def get_element_text(
         self,
@@ -59,12 +735,53 @@ class AbstractResumeParser(ABC):
         pass
 
     @abstractmethod
-    def parse_single_page(self, url: str) -> List[Resume]:
+    def parse_listing_page(self, url: str) -> ListingPage:
         pass
 
-    @abstractmethod
+    def parse_single_page(self, url: str) -> List[Resume]:
+        resumes = []
+
+        try:
+            page = self.parse_listing_page(url)
+            resumes = self.parse_cards(self.prefilter_cards(page.cards))
+        except Exception as e:
+            logging.error(f"Error parsing page: {str(e)}")
+        return resumes
+
+    def build_search_url(self, position: str, **kwargs) -> str:
+        """Build the listing URL from the filters iter_resumes accepts."""
+
+        return self.build_url(position, **kwargs)
+
+    def iter_resumes(self, position: str, **kwargs) -> Iterator[Resume]:
+        return self.iter_crawl(
+            self.build_search_url(position, **kwargs),
+            keywords=position.split(),
+        )
+
+    async def aiter_resumes(
+        self, position: str, **kwargs
+    ) -> AsyncIterator[Resume]:
+        """
+        Async variant of iter_resumes.
+
+        The blocking crawl advances in a worker thread, one resume at a
+        time, so the event loop stays free between resumes.
+        """
+
+        resumes = self.iter_resumes(position, **kwargs)
+        done = object()
+
+        try:
+            while (
+                resume := await asyncio.to_thread(next, resumes, done)
+            ) is not done:
+                yield resume
+        finally:
+            await asyncio.to_thread(resumes.close)
+
     def parse_resumes(self, position: str, **kwargs) -> List[Resume]:
-        pass
+        return list(self.iter_resumes(position, **kwargs))
 
     @abstractmethod
     def build_url(self, **kwargs) -> str:
@@ -0,0 +1,444 @@
+import json
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_process(pid: int) -> Optional[Tuple[str, int]]:
+    """Return the name and parent pid of a process, from /proc."""
+
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as file:
+            stat = file.read()
+    except OSError:
+        return None
+
+    name = stat[stat.index("(") + 1:stat.rindex(")")]
+    ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+    return name, ppid
+
+
+def process_start_time(pid: int) -> Optional[int]:
+    """Start time of a process in clock ticks, None if it isn't running."""
+
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as file:
+            stat = file.read()
+    except OSError:
+        return None
+
+    return int(stat[stat.rindex(")") + 2:].split()[19])
+
+
+def list_processes() -> Dict[int, Tuple[str, int]]:
+    if not os.path.isdir("/proc"):
+        return {}
+
+    processes = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            process = read_process(int(entry))
+            if process:
+                processes[int(entry)] = process
+    return processes
+
+
+def process_tree(
+    pid: int, processes: Optional[Dict[int, Tuple[str, int]]] = None
+) -> List[int]:
+    processes = processes if processes is not None else list_processes()
+    children: Dict[int, List[int]] = {}
+    for child, (_, ppid) in processes.items():
+        children.setdefault(ppid, []).append(child)
+
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def process_rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm", encoding="utf-8") as file:
+            return int(file.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def tree_rss(
+    pid: int, processes: Optional[Dict[int, Tuple[str, int]]] = None
+) -> int:
+    """Resident memory of a process and all its descendants, in bytes."""
+
+    return sum(process_rss(child) for child in process_tree(pid, processes))
+
+
+def driver_pid(driver: WebDriver) -> Optional[int]:
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+
+class PidFile:
+    """
+    Browser processes started by BrowserService, kept in a JSON file.
+
+    Each pid is stored with its start time and with the pid and start
+    time of the process that launched it. A reused pid, or a browser of
+    another bot process that is still running, is never taken for a
+    leftover of a crash.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.owner = [os.getpid(), process_start_time(os.getpid())]
+
+    def load(self) -> List[list]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return []
+
+    def save(self, entries: List[list]) -> None:
+        try:
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(entries, file)
+        except OSError as e:
+            logging.error(f"Error writing browser pid file: {e}")
+
+    def add(self, pids: Iterable[int]) -> None:
+        entries = self.load()
+        for pid in pids:
+            started = process_start_time(pid)
+            if started is not None:
+                entries.append([pid, started] + self.owner)
+        self.save(entries)
+
+    def is_leftover(self, entry: list, keep: Set[int]) -> bool:
+        pid, _, owner, owner_started = entry
+        if pid in keep:
+            return False
+        return [owner, owner_started] == self.owner or (
+            process_start_time(owner) != owner_started
+        )
+
+    def reap(self, keep: Set[int]) -> int:
+        """
+        Kill the recorded processes that aren't in keep and whose
+        launcher is this process or is gone, return how many.
+        """
+
+        entries, reaped = [], 0
+        for entry in self.load():
+            if process_start_time(entry[0]) != entry[1]:
+                continue
+
+            if not self.is_leftover(entry, keep):
+                entries.append(entry)
+                continue
+
+            pid = entry[0]
+            try:
+                os.kill(pid, signal.SIGKILL)
+                reaped += 1
+            except OSError as e:
+                logging.error(f"Error killing leftover process {pid}: {e}")
+                entries.append(entry)
+
+        self.save(entries)
+        if reaped:
+            logging.warning(f"Killed {reaped} leftover browser processes")
+        return reaped
+
+
+class SessionStore:
+    """
+    Browser cookies of a logged-in session, kept in a JSON file.
+
+    Expired cookies are dropped on load, an empty result means the
+    session has to be started again with a full login.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def load(self) -> List[dict]:
+        with self.lock:
+            try:
+                with open(self.path, encoding="utf-8") as file:
+                    cookies = json.load(file)
+            except (OSError, ValueError):
+                return []
+
+        now = time.time()
+        return [
+            cookie
+            for cookie in cookies
+            if cookie.get("expiry") is None or cookie["expiry"] > now
+        ]
+
+    def save(self, cookies: List[dict]) -> None:
+        with self.lock:
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(cookies, file)
+
+    def clear(self) -> None:
+        with self.lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+@dataclass
+class BrowserRecord:
+    site: str
+    driver: WebDriver
+    pid: Optional[int]
+    pages: int = 0
+    rss: int = 0
+
+
+class BrowserService:
+    """
+    Long-lived pool of started browsers shared by all parsers.
+
+    A background thread keeps warm[site] browsers of each site started
+    ahead of time, the site factory also does any login, so a search
+    gets a ready browser instead of waiting for Chrome and the login
+    flow. Browsers go back to the pool when a parser is done with them.
+    Before an idle browser is handed out, session_checks[site] makes
+    sure it is still logged in, logging in again if the session expired
+    while the browser sat idle.
+
+    The service also owns the browsers' lifecycle: a browser is
+    recycled after max_pages page loads or once its process tree uses
+    more than max_rss bytes. The chromedriver and Chrome processes it
+    starts are recorded in the pid_path file, the ones that outlived
+    their browser, e.g. after a crash, are killed at start and every
+    reap_interval. Processes the service didn't start are left alone.
+    """
+
+    def __init__(
+        self,
+        factories: Dict[str, Callable[[], WebDriver]],
+        warm: Optional[Dict[str, int]] = None,
+        max_idle: int = 2,
+        refill_interval: float = 5.0,
+        max_pages: Optional[int] = 200,
+        max_rss: Optional[int] = 1024 * 1024 * 1024,
+        rss_check_every: int = 10,
+        reap_interval: float = 300.0,
+        pid_path: Optional[str] = "browser_pids.json",
+        session_checks: Optional[
+            Dict[str, Callable[[WebDriver], None]]
+        ] = None,
+    ):
+        self.factories = factories
+        self.warm = warm or {}
+        self.max_idle = max_idle
+        self.refill_interval = refill_interval
+        self.max_pages = max_pages
+        self.max_rss = max_rss
+        self.rss_check_every = rss_check_every
+        self.reap_interval = reap_interval
+        self.pids = PidFile(pid_path) if pid_path else None
+        self.session_checks = session_checks or {}
+        self.idle: Dict[str, queue.Queue] = {
+            site: queue.Queue() for site in factories
+        }
+        self.live: Dict[int, BrowserRecord] = {}
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "BrowserService":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+
+        self.reap()
+        self.thread = threading.Thread(
+            target=self.maintain, name="browser-service", daemon=True
+        )
+        self.thread.start()
+
+    def maintain(self) -> None:
+        reaped_at = time.monotonic()
+        while not self.stop.is_set():
+            self.keep_warm()
+
+            if time.monotonic() - reaped_at >= self.reap_interval:
+                self.reap()
+                reaped_at = time.monotonic()
+
+            self.stop.wait(self.refill_interval)
+
+    def keep_warm(self) -> None:
+        for site, count in self.warm.items():
+            while (
+                not self.stop.is_set()
+                and self.idle[site].qsize() < min(count, self.max_idle)
+            ):
+                try:
+                    driver = self.launch(site)
+                except Exception as e:
+                    logging.error(f"Error starting {site} browser: {e}")
+                    break
+                self.idle[site].put(driver)
+
+    def reap(self) -> int:
+        """
+        Kill recorded browser processes that no live browser owns.
+
+        The lock is held from the process scan to the kills, a browser
+        launched meanwhile can't be mistaken for a leftover.
+        """
+
+        if self.pids is None:
+            return 0
+
+        with self.lock:
+            processes = list_processes()
+            keep = {
+                pid
+                for record in self.live.values()
+                if record.pid
+                for pid in process_tree(record.pid, processes)
+            }
+            return self.pids.reap(keep)
+
+    def launch(self, site: str) -> WebDriver:
+        driver = self.factories[site]()
+        pid = driver_pid(driver)
+        with self.lock:
+            self.live[id(driver)] = BrowserRecord(
+                site=site, driver=driver, pid=pid
+            )
+            if pid and self.pids is not None:
+                self.pids.add(process_tree(pid))
+        return driver
+
+    @staticmethod
+    def is_alive(driver: WebDriver) -> bool:
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, site: str) -> WebDriver:
+        while True:
+            try:
+                driver = self.idle[site].get_nowait()
+            except queue.Empty:
+                return self.launch(site)
+
+            if (
+                self.is_alive(driver)
+                and not self.should_recycle(driver)
+                and self.check_session(site, driver)
+            ):
+                return driver
+            self.quit(driver)
+
+    def check_session(self, site: str, driver: WebDriver) -> bool:
+        check = self.session_checks.get(site)
+        if check is None:
+            return True
+
+        try:
+            check(driver)
+            return True
+        except Exception as e:
+            logging.error(f"Error checking {site} session: {e}")
+            return False
+
+    def release(self, site: str, driver: WebDriver) -> None:
+        if (
+            not self.stop.is_set()
+            and self.idle[site].qsize() < self.max_idle
+            and self.is_alive(driver)
+            and not self.should_recycle(driver)
+        ):
+            self.idle[site].put(driver)
+        else:
+            self.quit(driver)
+
+    def record_page(self, driver: WebDriver) -> None:
+        record = self.live.get(id(driver))
+        if record is None:
+            return
+
+        record.pages += 1
+        if record.pid and record.pages % self.rss_check_every == 0:
+            record.rss = tree_rss(record.pid)
+
+    def should_recycle(self, driver: WebDriver) -> bool:
+        record = self.live.get(id(driver))
+        if record is None:
+            return False
+
+        return (
+            self.max_pages is not None and record.pages >= self.max_pages
+        ) or (self.max_rss is not None and record.rss > self.max_rss)
+
+    def quit(self, driver: WebDriver) -> None:
+        with self.lock:
+            self.live.pop(id(driver), None)
+
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.error(f"Error closing browser: {e}")
+
+    def stats(self) -> Dict[str, dict]:
+        """Live and idle browsers per site and their memory use."""
+
+        with self.lock:
+            records = list(self.live.values())
+
+        processes = list_processes()
+        stats = {
+            site: {"live": 0, "idle": idle.qsize(), "rss": 0}
+            for site, idle in self.idle.items()
+        }
+        for record in records:
+            site_stats = stats[record.site]
+            site_stats["live"] += 1
+            if record.pid:
+                record.rss = tree_rss(record.pid, processes)
+                site_stats["rss"] += record.rss
+
+        return stats
+
+    def close(self) -> None:
+        self.stop.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        for idle in self.idle.values():
+            while True:
+                try:
+                    self.quit(idle.get_nowait())
+                except queue.Empty:
+                    break
@@ -0,0 +1,245 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Set
+
+from db import connect
+
+
+@dataclass
+class CrawlState:
+    id: int
+    start_url: str
+    next_url: Optional[str]
+    created_at: float = 0.0
+    search_id: Optional[int] = None
+    done_resumes: Set[str] = field(default_factory=set)
+
+
+class CrawlStateStore:
+    """
+    Progress of crawls kept in SQLite, next to the resumes.
+
+    A crawl is identified by its start URL, which already encodes the
+    site and every search filter. An unfinished crawl with the same
+    start URL is picked up where it stopped: from the first listing
+    page that wasn't completed, skipping resumes already processed.
+    Each crawl belongs to the search its resumes are saved under.
+
+    A crawl that is being run in this process is claimed until it is
+    finished or released, and so is a search a job is saving into.
+    Claimed crawls, and the crawls of claimed searches, are never
+    picked up by another job, a status of 'running' alone doesn't tell
+    an interrupted crawl from one in progress.
+
+    Parser threads write progress while the repository's writer saves
+    resumes to the same file, the connection is opened by db.connect
+    for the same WAL mode and busy timeout.
+    """
+
+    def __init__(self, db_path: str = "resumes.db"):
+        self.lock = threading.Lock()
+        self.conn = connect(db_path, check_same_thread=False)
+        self.active: Set[int] = set()
+        self.active_searches: Set[int] = set()
+        self.create_tables()
+
+    def create_tables(self) -> None:
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS crawls (
+                id INTEGER PRIMARY KEY,
+                start_url TEXT,
+                next_url TEXT,
+                status TEXT,
+                created_at REAL,
+                updated_at REAL,
+                search_id INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_crawls_start_url_status
+                ON crawls (start_url, status);
+            CREATE TABLE IF NOT EXISTS crawl_pages (
+                crawl_id INTEGER,
+                url TEXT,
+                PRIMARY KEY (crawl_id, url)
+            );
+            CREATE TABLE IF NOT EXISTS crawl_resumes (
+                crawl_id INTEGER,
+                url TEXT,
+                PRIMARY KEY (crawl_id, url)
+            );
+            """
+        )
+        columns = {
+            row[1] for row in self.conn.execute("PRAGMA table_info(crawls)")
+        }
+        if "search_id" not in columns:
+            self.conn.execute(
+                "ALTER TABLE crawls ADD COLUMN search_id INTEGER"
+            )
+        self.conn.commit()
+
+    def find_unfinished(
+        self, start_url: str, search_id: Optional[int] = None
+    ) -> Optional[CrawlState]:
+        """
+        The latest unfinished crawl of start_url nobody is running.
+
+        Crawls of claimed searches are skipped, except for search_id.
+        """
+
+        with self.lock:
+            return self.find_available(start_url, search_id)
+
+    def find_available(
+        self, start_url: str, search_id: Optional[int]
+    ) -> Optional[CrawlState]:
+        rows = self.conn.execute(
+            """
+            SELECT id, next_url, created_at, search_id FROM crawls
+            WHERE start_url = ? AND status = 'running'
+            ORDER BY id DESC
+            """,
+            (start_url,),
+        ).fetchall()
+
+        row = next(
+            (
+                row
+                for row in rows
+                if row[0] not in self.active
+                and (
+                    row[3] is None
+                    or row[3] == search_id
+                    or row[3] not in self.active_searches
+                )
+            ),
+            None,
+        )
+        if row is None:
+            return None
+
+        done_resumes = {
+            url
+            for url, in self.conn.execute(
+                "SELECT url FROM crawl_resumes WHERE crawl_id = ?",
+                (row[0],),
+            )
+        }
+
+        return CrawlState(
+            id=row[0],
+            start_url=start_url,
+            next_url=row[1],
+            created_at=row[2],
+            search_id=row[3],
+            done_resumes=done_resumes,
+        )
+
+    def claim_search(self, search_id: int) -> bool:
+        """Claim search_id for one job, False if another job has it."""
+
+        with self.lock:
+            if search_id in self.active_searches:
+                return False
+            self.active_searches.add(search_id)
+            return True
+
+    def release_search(self, search_id: int) -> None:
+        with self.lock:
+            self.active_searches.discard(search_id)
+
+    def start(
+        self, start_url: str, search_id: Optional[int] = None
+    ) -> CrawlState:
+        """
+        Resume the unfinished crawl of start_url or start a new one.
+
+        An unfinished crawl of another search is abandoned, its skipped
+        resumes were saved under that search and not under search_id.
+        The crawl is claimed until finish or release.
+        """
+
+        with self.lock:
+            state = self.find_available(start_url, search_id)
+            if (
+                state
+                and search_id is not None
+                and state.search_id != search_id
+            ):
+                self.mark_done(state)
+                state = None
+
+            if state is None:
+                now = time.time()
+                cursor = self.conn.execute(
+                    """
+                    INSERT INTO crawls (
+                        start_url, next_url, status, created_at, updated_at,
+                        search_id
+                    )
+                    VALUES (?, ?, 'running', ?, ?, ?)
+                    """,
+                    (start_url, start_url, now, now, search_id),
+                )
+                self.conn.commit()
+                state = CrawlState(
+                    id=cursor.lastrowid,
+                    start_url=start_url,
+                    next_url=start_url,
+                    created_at=now,
+                    search_id=search_id,
+                )
+
+            self.active.add(state.id)
+            return state
+
+    def release(self, state: CrawlState) -> None:
+        """Stop running a crawl without finishing it, so it can resume."""
+
+        with self.lock:
+            self.active.discard(state.id)
+
+    def resume_done(self, state: CrawlState, url: str) -> None:
+        state.done_resumes.add(url)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO crawl_resumes (crawl_id, url) "
+                "VALUES (?, ?)",
+                (state.id, url),
+            )
+            self.conn.commit()
+
+    def page_done(
+        self, state: CrawlState, url: str, next_url: Optional[str]
+    ) -> None:
+        state.next_url = next_url
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO crawl_pages (crawl_id, url) "
+                "VALUES (?, ?)",
+                (state.id, url),
+            )
+            self.conn.execute(
+                "UPDATE crawls SET next_url = ?, updated_at = ? WHERE id = ?",
+                (next_url, time.time(), state.id),
+            )
+            self.conn.commit()
+
+    def finish(self, state: CrawlState) -> None:
+        with self.lock:
+            self.mark_done(state)
+
+    def mark_done(self, state: CrawlState) -> None:
+        self.conn.execute(
+            "UPDATE crawls SET status = 'done', updated_at = ? WHERE id = ?",
+            (time.time(), state.id),
+        )
+        self.conn.execute(
+            "DELETE FROM crawl_resumes WHERE crawl_id = ?", (state.id,)
+        )
+        self.conn.execute(
+            "DELETE FROM crawl_pages WHERE crawl_id = ?", (state.id,)
+        )
+        self.conn.commit()
+        self.active.discard(state.id)
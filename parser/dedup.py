@@ -0,0 +1,259 @@
+import hashlib
+import random
+import re
+from collections import OrderedDict, defaultdict
+from dataclasses import replace
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from parser.relevance import calculate_resume_score
+from parser.resume_types import Resume
+
+MERSENNE_PRIME = (1 << 61) - 1
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text: Optional[str]) -> List[str]:
+    return WORD_PATTERN.findall(text.lower()) if text else []
+
+
+def name_key(resume: Resume) -> Optional[str]:
+    """Normalized full name, word order ignored, None if unknown."""
+
+    words = normalize(resume.full_name)
+    return " ".join(sorted(words)) if words else None
+
+
+def resume_features(resume: Resume) -> Set[str]:
+    features = {f"name:{word}" for word in normalize(resume.full_name)}
+    features.update(
+        f"position:{word}" for word in normalize(resume.position)
+    )
+
+    for experience in resume.experience or []:
+        company = " ".join(normalize(experience.company))
+        if company:
+            features.add(f"company:{company}")
+
+    for skill in resume.skills or []:
+        skill = " ".join(normalize(skill))
+        if skill:
+            features.add(f"skill:{skill}")
+
+    return features
+
+
+def stable_hash(value: str, size: int = 8) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=size).digest(),
+        "big",
+    )
+
+
+class MinHasher:
+    """
+    MinHash signatures with LSH banding.
+
+    Two resumes whose feature sets have Jaccard similarity s share at
+    least one band bucket with probability 1 - (1 - s^rows)^bands, so
+    likely duplicates are found by bucket lookups instead of comparing
+    every pair.
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 4, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        generator = random.Random(seed)
+        self.permutations = [
+            (
+                generator.randrange(1, MERSENNE_PRIME),
+                generator.randrange(0, MERSENNE_PRIME),
+            )
+            for _ in range(bands * rows)
+        ]
+
+    def signature(self, features: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [stable_hash(feature) for feature in features]
+        if not hashes:
+            return ()
+
+        return tuple(
+            min([(a * value + b) % MERSENNE_PRIME for value in hashes])
+            for a, b in self.permutations
+        )
+
+    def band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+        """(band, bucket) pairs of a signature, buckets fit in SQLite."""
+
+        if not signature:
+            return []
+
+        return [
+            (
+                band,
+                stable_hash(
+                    repr(signature[band * self.rows:(band + 1) * self.rows]),
+                    size=7,
+                ),
+            )
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        if not first or not second:
+            return 0.0
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def merge_lists(first: Optional[list], second: Optional[list]) -> list:
+    first, second = first or [], second or []
+    return first if len(first) >= len(second) else second
+
+
+def merge_skills(
+    first: Optional[List[str]], second: Optional[List[str]]
+) -> Optional[List[str]]:
+    skills = {}
+    for skill in (first or []) + (second or []):
+        skills.setdefault(skill.lower(), skill)
+    return list(skills.values()) or None
+
+
+def merge_resumes(canonical: Resume, duplicate: Resume) -> Resume:
+    """
+    Fold duplicate into canonical, keeping the canonical URL.
+
+    Missing fields are filled in from the duplicate, the longer of the
+    two experience, education and language lists wins, skills are
+    combined. The score is recalculated for the merged record.
+    """
+
+    merged = replace(
+        canonical,
+        full_name=canonical.full_name or duplicate.full_name,
+        position=canonical.position or duplicate.position,
+        experience_years=max(
+            canonical.experience_years or 0, duplicate.experience_years or 0
+        ) or None,
+        experience=merge_lists(canonical.experience, duplicate.experience),
+        education=merge_lists(canonical.education, duplicate.education),
+        languages=merge_lists(canonical.languages, duplicate.languages),
+        skills=merge_skills(canonical.skills, duplicate.skills),
+        details=max(
+            canonical.details or "", duplicate.details or "", key=len
+        ) or None,
+        location=canonical.location or duplicate.location,
+        salary=canonical.salary or duplicate.salary,
+        fingerprint=None,
+    )
+    merged.score = calculate_resume_score(merged)
+    return merged
+
+
+class Deduplicator:
+    """
+    Merge duplicate resumes of one crawl before they are ranked.
+
+    A resume is a duplicate of an earlier one when both have the same
+    normalized full name and their MinHash similarity reaches
+    threshold. Candidates come from the LSH buckets, so the cost per
+    resume doesn't grow with the number of resumes seen.
+
+    Only the name key and signature of each canonical resume are kept,
+    plus the last recent full records. An older canonical record is
+    read back with load, e.g. from the resumes saved so far. Without
+    load, or if it isn't found, the duplicate is passed through as is.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        hasher: Optional[MinHasher] = None,
+        load: Optional[Callable[[str], Optional[Resume]]] = None,
+        recent: int = 1000,
+    ):
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self.load = load
+        self.recent_size = recent
+        self.buckets: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+        self.names: Dict[str, str] = {}
+        self.signatures: Dict[str, Tuple[int, ...]] = {}
+        self.recent: OrderedDict[str, Resume] = OrderedDict()
+
+    def find_duplicate(
+        self, resume: Resume, signature: Tuple[int, ...]
+    ) -> Optional[str]:
+        key = name_key(resume)
+        if key is None:
+            return None
+
+        candidates = {
+            url
+            for band_key in self.hasher.band_keys(signature)
+            for url in self.buckets.get(band_key, ())
+        }
+        for url in candidates:
+            if (
+                self.names[url] == key
+                and self.hasher.similarity(signature, self.signatures[url])
+                >= self.threshold
+            ):
+                return url
+
+        return None
+
+    def remember(self, resume: Resume) -> None:
+        self.recent[resume.url] = resume
+        self.recent.move_to_end(resume.url)
+        while len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+
+    def canonical(self, url: str) -> Optional[Resume]:
+        if url in self.recent:
+            return self.recent[url]
+        return self.load(url) if self.load is not None else None
+
+    def add(self, resume: Resume) -> Resume:
+        """Return resume, or the canonical record it was merged into."""
+
+        signature = self.hasher.signature(resume_features(resume))
+        url = self.find_duplicate(resume, signature)
+
+        if url is None:
+            key = name_key(resume)
+            if key is not None:
+                self.names[resume.url] = key
+                self.signatures[resume.url] = signature
+                for band_key in self.hasher.band_keys(signature):
+                    self.buckets[band_key].append(resume.url)
+            self.remember(resume)
+            return resume
+
+        canonical = self.canonical(url)
+        if canonical is None:
+            return resume
+
+        merged = merge_resumes(canonical, resume)
+        self.remember(merged)
+        return merged
+
+    def dedup(self, resumes: Iterable[Resume]) -> Iterator[Resume]:
+        """
+        Yield each resume, or its updated canonical record.
+
+        A merged record is yielded again under the canonical URL, so
+        consumers keyed on the URL replace what they got before.
+        """
+
+        for resume in resumes:
+            yield self.add(resume)
@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class DriverPool:
+    """
+    A bounded pool of WebDriver workers.
+
+    Drivers are started lazily, the first time a task asks for one, so a
+    pool of N workers never holds more than N browsers and never starts
+    one for tasks that don't need a browser. On close the drivers are
+    handed to release_driver, which quits them by default.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        create_driver: Callable[[], WebDriver],
+        release_driver: Optional[Callable[[WebDriver], None]] = None,
+    ):
+        self.size = size
+        self.create_driver = create_driver
+        self.release_driver = release_driver or WebDriver.quit
+        self.drivers: List[WebDriver] = []
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = 0
+        self.executor = ThreadPoolExecutor(
+            max_workers=size, thread_name_prefix="driver-pool"
+        )
+
+    def acquire(self) -> WebDriver:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            can_start = self.started < self.size
+            if can_start:
+                self.started += 1
+
+        if not can_start:
+            return self.idle.get()
+
+        try:
+            driver = self.create_driver()
+        except Exception:
+            with self.lock:
+                self.started -= 1
+            raise
+
+        with self.lock:
+            self.drivers.append(driver)
+        return driver
+
+    def release(self, driver: WebDriver) -> None:
+        self.idle.put(driver)
+
+    def replace(self, driver: WebDriver) -> WebDriver:
+        """Swap a leased driver for a fresh one, e.g. to recycle it."""
+
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+            self.started -= 1
+
+        try:
+            self.release_driver(driver)
+        except Exception as e:
+            logging.error(f"Error closing pooled driver: {e}")
+
+        with self.lock:
+            self.started += 1
+
+        try:
+            new_driver = self.create_driver()
+        except Exception:
+            with self.lock:
+                self.started -= 1
+            raise
+
+        with self.lock:
+            self.drivers.append(new_driver)
+        return new_driver
+
+    def map(self, func: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """Run func over items on the pool, keeping the input order."""
+
+        return list(self.executor.map(func, items))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+        with self.lock:
+            drivers, self.drivers = self.drivers, []
+            self.started = 0
+
+        for driver in drivers:
+            try:
+                self.release_driver(driver)
+            except Exception as e:
+                logging.error(f"Error closing pooled driver: {e}")
@@ -0,0 +1,175 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from parser.resume_types import Resume
+from parser.robota_ua.utils import (
+    RobotaCity,
+    RobotaExperienceLevel,
+    RobotaPostingPeriod,
+    RobotaSearchType,
+)
+from parser.work_ua.utils import (
+    WorkUaCity,
+    WorkUaExperience,
+    WorkUaPostingPeriod,
+    WorkUaSalary,
+    WorkUaSearchType,
+)
+
+ROBOTA_SEARCH_TYPES = {
+    WorkUaSearchType.DEFAULT: RobotaSearchType.SYNONYMS,
+    WorkUaSearchType.TITLE_ONLY: RobotaSearchType.SPECIALITY,
+    WorkUaSearchType.SYNONYMS_ONLY: RobotaSearchType.SYNONYMS,
+    WorkUaSearchType.ANY_WORD: RobotaSearchType.EVERYWHERE,
+}
+ROBOTA_EXPERIENCE = {
+    WorkUaExperience.NO_EXPERIENCE: [RobotaExperienceLevel.NO_EXPERIENCE],
+    WorkUaExperience.UP_TO_1_YEAR: [RobotaExperienceLevel.UP_TO_1_YEAR],
+    WorkUaExperience.FROM_1_TO_2_YEARS: [
+        RobotaExperienceLevel.FROM_1_TO_2_YEARS
+    ],
+    WorkUaExperience.FROM_2_TO_5_YEARS: [
+        RobotaExperienceLevel.FROM_2_TO_5_YEARS
+    ],
+    WorkUaExperience.OVER_5_YEARS: [
+        RobotaExperienceLevel.FROM_5_TO_10_YEARS,
+        RobotaExperienceLevel.MORE_THAN_10_YEARS,
+    ],
+}
+ROBOTA_POSTING_PERIODS = {
+    WorkUaPostingPeriod.THREE_MONTHS: RobotaPostingPeriod.THREE_MONTHS,
+    WorkUaPostingPeriod.ONE_DAY: RobotaPostingPeriod.TODAY,
+    WorkUaPostingPeriod.SEVEN_DAYS: RobotaPostingPeriod.WEEK,
+    WorkUaPostingPeriod.THIRTY_DAYS: RobotaPostingPeriod.MONTH,
+    WorkUaPostingPeriod.ONE_YEAR: RobotaPostingPeriod.YEAR,
+    WorkUaPostingPeriod.ALL_TIME: RobotaPostingPeriod.ALL_TIME,
+}
+
+
+def robota_city(city: WorkUaCity) -> RobotaCity:
+    return next(
+        (
+            robota_city
+            for robota_city in RobotaCity
+            if robota_city.ukraine == city.ukraine
+        ),
+        RobotaCity.ALL_UKRAINE,
+    )
+
+
+def robota_salary(salary: Optional[WorkUaSalary]) -> Optional[int]:
+    return int(salary.ukraine) if salary else None
+
+
+def robota_filters(
+    position: str,
+    city: WorkUaCity = WorkUaCity.ALL_UKRAINE,
+    search_type: WorkUaSearchType = WorkUaSearchType.DEFAULT,
+    salary_from: Optional[WorkUaSalary] = None,
+    salary_to: Optional[WorkUaSalary] = None,
+    experience: Optional[List[WorkUaExperience]] = None,
+    public_period: WorkUaPostingPeriod = WorkUaPostingPeriod.THREE_MONTHS,
+) -> dict:
+    """
+    Map work.ua search filters onto RobotaUaParser.build_search_url.
+
+    Options robota.ua doesn't have, such as the remote city, fall back
+    to the widest robota.ua filter.
+    """
+
+    return dict(
+        position=position,
+        city=robota_city(city),
+        search_type=ROBOTA_SEARCH_TYPES[search_type],
+        salary_from=robota_salary(salary_from),
+        salary_to=robota_salary(salary_to),
+        experience=[
+            level
+            for exp in experience or []
+            for level in ROBOTA_EXPERIENCE[exp]
+        ]
+        or None,
+        public_period=ROBOTA_POSTING_PERIODS[public_period],
+    )
+
+
+@dataclass
+class FederatedResult:
+    resumes: List[Resume]
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+class FederatedSearch:
+    """
+    Run the crawls of several sites at once and merge their resumes.
+
+    Each site's resume stream advances in its own thread, the merged
+    stream yields resumes as soon as any site produces one, so the
+    whole search takes as long as the slowest site. A failing site is
+    logged and recorded in errors without stopping the others.
+    """
+
+    def __init__(self, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    def merge(self, streams: Dict[str, Iterator[Resume]]) -> Iterator[Resume]:
+        resumes = queue.Queue(maxsize=self.buffer_size)
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    resumes.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce(site: str, stream: Iterator[Resume]) -> None:
+            started_at = time.monotonic()
+            try:
+                for resume in stream:
+                    if not put(resume):
+                        break
+            except Exception as e:
+                logging.error(f"Error crawling {site}: {e}")
+                self.errors[site] = str(e)
+            finally:
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+                self.timings[site] = time.monotonic() - started_at
+                put(done)
+
+        threads = [
+            threading.Thread(
+                target=produce,
+                args=(site, stream),
+                name=f"federated-{site}",
+                daemon=True,
+            )
+            for site, stream in streams.items()
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            remaining = len(threads)
+            while remaining:
+                item = resumes.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,84 @@
+import heapq
+import itertools
+from collections import deque
+from typing import Iterable, Iterator, List
+
+from parser.relevance import card_priority
+from parser.resume_types import ListingPage, ResumeCard
+
+
+class CrawlFrontier:
+    """
+    Queue of resume cards waiting for a detail fetch, best first.
+
+    Listing pages are pulled lookahead pages ahead of the fetches and
+    the cards from all of them compete in one priority queue, ordered
+    by card_priority, so the best candidates are fetched first
+    wherever they sit in the listing.
+    """
+
+    def __init__(
+        self,
+        pages: Iterator[ListingPage],
+        lookahead: int = 3,
+        keywords: Iterable[str] = (),
+    ):
+        self.pages = pages
+        self.lookahead = lookahead
+        self.keywords = list(keywords)
+        self.heap = []
+        self.counter = itertools.count()
+        self.loaded = deque()
+        self.page_size = 1
+        self.exhausted = False
+
+    def load_page(self) -> None:
+        page = next(self.pages, None)
+        if page is None:
+            self.exhausted = True
+            return
+
+        entry = [page, len(page.cards)]
+        self.loaded.append(entry)
+        self.page_size = max(self.page_size, len(page.cards))
+
+        for card in page.cards:
+            heapq.heappush(
+                self.heap,
+                (
+                    -card_priority(card, self.keywords),
+                    next(self.counter),
+                    card,
+                    entry,
+                ),
+            )
+
+    def fill(self) -> None:
+        while not self.exhausted and (
+            len(self.heap) < self.lookahead * self.page_size
+        ):
+            self.load_page()
+
+    def pop(self, count: int = 1) -> List[ResumeCard]:
+        """Take up to count best cards, loading listing pages as needed."""
+
+        self.fill()
+
+        cards = []
+        while self.heap and len(cards) < count:
+            _, _, card, entry = heapq.heappop(self.heap)
+            entry[1] -= 1
+            cards.append(card)
+
+        return cards
+
+    def completed_pages(self) -> Iterator[ListingPage]:
+        """
+        Yield the pages, in listing order, whose cards were all taken.
+
+        A page is only yielded once every page before it is complete,
+        so a checkpoint built from them never skips unfetched cards.
+        """
+
+        while self.loaded and self.loaded[0][1] == 0:
+            yield self.loaded.popleft()[0]
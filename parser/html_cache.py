@@ -0,0 +1,130 @@
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class HtmlCache:
+    """
+    URL-keyed store of raw page HTML backed by SQLite.
+
+    Entries older than ttl seconds are treated as misses. When the
+    stored size exceeds max_bytes the least recently used entries are
+    evicted. In replay_only mode the TTL is ignored and parsers must not
+    go to the network on a miss, so a stored crawl can be re-parsed
+    offline.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "html_cache.db",
+        ttl: float = 6 * 3600,
+        max_bytes: int = 512 * 1024 * 1024,
+        compress: bool = True,
+        replay_only: bool = False,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.replay_only = replay_only
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.create_tables()
+        self.total_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM pages"
+        ).fetchone()[0]
+
+    def create_tables(self) -> None:
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body BLOB,
+                compressed INTEGER,
+                size INTEGER,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pages_accessed_at "
+            "ON pages (accessed_at)"
+        )
+        self.conn.commit()
+
+    def get(self, url: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, compressed, fetched_at FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            body, compressed, fetched_at = row
+            if not self.replay_only and time.time() - fetched_at > self.ttl:
+                return None
+
+            self.conn.execute(
+                "UPDATE pages SET accessed_at = ? WHERE url = ?",
+                (time.time(), url),
+            )
+            self.conn.commit()
+
+        if compressed:
+            body = zlib.decompress(body)
+        return body.decode("utf-8")
+
+    def put(self, url: str, html: str) -> None:
+        if self.replay_only:
+            return
+
+        body = html.encode("utf-8")
+        if self.compress:
+            body = zlib.compress(body)
+
+        now = time.time()
+        with self.lock:
+            previous = self.conn.execute(
+                "SELECT size FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if previous:
+                self.total_bytes -= previous[0]
+
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO pages
+                    (url, body, compressed, size, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (url, body, int(self.compress), len(body), now, now),
+            )
+            self.total_bytes += len(body)
+            self.evict()
+            self.conn.commit()
+
+    def evict(self) -> None:
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT url, size FROM pages ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+
+            for url, size in rows:
+                self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,104 @@
+import hashlib
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "footer",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "header",
+    "hr",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "table",
+    "tr",
+    "ul",
+}
+SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, "html.parser")
+
+
+def _collect_text(element: Tag, parts: List[str]) -> None:
+    for child in element.children:
+        if isinstance(child, Comment):
+            continue
+
+        if isinstance(child, NavigableString):
+            parts.append(str(child))
+            continue
+
+        if child.name in SKIPPED_TAGS:
+            continue
+
+        if child.name == "br":
+            parts.append("\n")
+            continue
+
+        is_block = child.name in BLOCK_TAGS
+        if is_block:
+            parts.append("\n")
+        _collect_text(child, parts)
+        if is_block:
+            parts.append("\n")
+
+
+def element_text(element: Optional[Tag], default: Optional[str] = None):
+    """
+    Return the text of an element the way WebElement.text renders it:
+    block elements and <br> start new lines, whitespace inside a line
+    is collapsed and empty lines are dropped.
+    """
+
+    if element is None:
+        return default
+
+    parts = []
+    _collect_text(element, parts)
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def element_lines(element: Optional[Tag]) -> List[str]:
+    text = element_text(element)
+    return text.split("\n") if text else []
+
+
+def class_equals(element: Tag, value: str) -> bool:
+    return " ".join(element.get("class", [])) == value
+
+
+def find_heading(soup: BeautifulSoup, title: str) -> Optional[Tag]:
+    for heading in soup.find_all("h2"):
+        text = heading.find(string=True, recursive=False)
+        if text and title in text:
+            return heading
+
+    return None
+
+
+def text_fingerprint(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return None
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,137 @@
+import logging
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from parser.scheduler import FetchTicket, PolitenessScheduler, Throttled
+
+THROTTLE_STATUSES = (429, 503)
+CAPTCHA_MARKERS = ("g-recaptcha", "h-captcha", "cf-challenge", "captcha-form")
+THROTTLE_MARKERS = CAPTCHA_MARKERS + ("Too Many Requests",)
+THROTTLED = object()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_captcha_page(html: str) -> bool:
+    return any(marker in html for marker in CAPTCHA_MARKERS)
+
+
+def is_throttled_page(html: str) -> bool:
+    """A captcha or a 429 error page, as loaded in a browser."""
+
+    return any(marker in html for marker in THROTTLE_MARKERS)
+
+
+class HttpClient:
+    DEFAULT_HEADERS = {
+        "User-Agent": (
+            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+        ),
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "uk-UA,uk;q=0.9,en;q=0.8",
+    }
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        timeout: float = 10,
+        retries: int = 2,
+        scheduler: Optional[PolitenessScheduler] = None,
+        throttle_retries: int = 2,
+    ):
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.throttle_retries = throttle_retries
+        self.session = requests.Session()
+        self.session.headers.update(self.DEFAULT_HEADERS)
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 504),
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_text(self, url: str) -> Optional[str]:
+        """
+        Fetch url, returning None when it fails.
+
+        A 429, 503 or captcha page is reported to the scheduler, whose
+        backoff delays the retries. Raises Throttled when the last
+        retry is throttled too, a fallback fetch of the same URL would
+        only be throttled again.
+        """
+
+        attempts = self.throttle_retries + 1 if self.scheduler else 1
+        for _ in range(attempts):
+            html = self.fetch(url)
+            if html is not THROTTLED:
+                return html
+
+        raise Throttled(url)
+
+    def fetch(self, url: str):
+        request = (
+            self.scheduler.request(url)
+            if self.scheduler
+            else nullcontext(FetchTicket())
+        )
+
+        with request as ticket:
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                logging.error(f"Error fetching {url}: {e}")
+                ticket.fail()
+                return None
+
+            if response.status_code in THROTTLE_STATUSES:
+                ticket.throttle(
+                    parse_retry_after(response.headers.get("Retry-After"))
+                )
+                logging.error(f"Throttled with {response.status_code}: {url}")
+                return THROTTLED
+
+            if response.status_code != 200:
+                logging.error(
+                    f"Unexpected status {response.status_code} for {url}"
+                )
+                ticket.fail()
+                return None
+
+            if is_captcha_page(response.text):
+                ticket.throttle()
+                logging.error(f"Captcha page returned for {url}")
+                return THROTTLED
+
+            return response.text
+
+    def close(self) -> None:
+        self.session.close()
@@ -4,10 +4,10 @@ from parser.work_ua.work_ua_parser import WorkUaParser
 
 class ResumeParserFactory:
     @staticmethod
-    def get_parser(site: str) -> WorkUaParser | RobotaUaParser:
+    def get_parser(site: str, **kwargs) -> WorkUaParser | RobotaUaParser:
         if site == "work.ua":
-            return WorkUaParser()
+            return WorkUaParser(**kwargs)
         elif site == "robota.ua":
-            return RobotaUaParser()
+            return RobotaUaParser(**kwargs)
         else:
             raise ValueError("Unsupported job site")
@@ -0,0 +1,96 @@
+import heapq
+import itertools
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from parser.relevance import calculate_resume_score
+from parser.resume_types import Resume
+
+
+class TopKRanker:
+    """
+    The k best resumes of a crawl, kept in a bounded min-heap.
+
+    Resumes are added as they arrive, so the best-so-far list is always
+    available. A resume added again under the same URL replaces the
+    earlier version. The ranker also holds the crawl budget: the crawl stops
+    after max_pages listing pages or max_seconds, and cards whose score
+    upper bound can't beat the current k-th score are not fetched.
+    """
+
+    def __init__(
+        self,
+        k: int = 10,
+        max_pages: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+    ):
+        self.k = k
+        self.max_pages = max_pages
+        self.max_seconds = max_seconds
+        self.heap: List[Tuple[float, int, Resume]] = []
+        self.counter = itertools.count()
+        self.pages = 0
+        self.started_at = time.monotonic()
+
+    def add(self, resume: Resume) -> None:
+        if resume.score is None:
+            resume.score = calculate_resume_score(resume)
+
+        if any(entry.url == resume.url for _, _, entry in self.heap):
+            self.heap = [
+                item for item in self.heap if item[2].url != resume.url
+            ]
+            heapq.heapify(self.heap)
+
+        item = (resume.score, next(self.counter), resume)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item[0] > self.heap[0][0]:
+            heapq.heapreplace(self.heap, item)
+
+    def extend(self, resumes: Iterable[Resume]) -> None:
+        for resume in resumes:
+            self.add(resume)
+
+    def track(self, resumes: Iterable[Resume]) -> Iterator[Resume]:
+        """Pass resumes through, adding each one to the ranker."""
+
+        for resume in resumes:
+            self.add(resume)
+            yield resume
+
+    @property
+    def threshold(self) -> Optional[float]:
+        """The k-th best score, or None while fewer than k resumes."""
+
+        if len(self.heap) < self.k:
+            return None
+        return self.heap[0][0]
+
+    def can_improve(self, upper_bound: Optional[float]) -> bool:
+        threshold = self.threshold
+        return threshold is None or upper_bound is None or (
+            upper_bound > threshold
+        )
+
+    def expired(self) -> bool:
+        return (
+            self.max_seconds is not None
+            and time.monotonic() - self.started_at >= self.max_seconds
+        )
+
+    def page_done(self) -> bool:
+        """Count a listing page, return True when the budget is spent."""
+
+        self.pages += 1
+        return self.expired() or (
+            self.max_pages is not None and self.pages >= self.max_pages
+        )
+
+    def results(self) -> List[Resume]:
+        return [
+            resume
+            for _, _, resume in sorted(
+                self.heap, key=lambda item: (-item[0], item[1])
+            )
+        ]
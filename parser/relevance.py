@@ -1,4 +1,6 @@
-from parser.resume_types import Resume
+from typing import Iterable, Optional
+
+from parser.resume_types import Resume, ResumeCard
 
 
 def calculate_resume_score(resume: Resume) -> float:
@@ -48,3 +50,75 @@ def calculate_resume_score(resume: Resume) -> float:
         score += min(len(resume.skills), 10) * 2
 
     return score
+
+
+def calculate_card_score(card: ResumeCard) -> Optional[float]:
+    """
+    Provisional score of a resume from its listing card alone.
+
+    The card preview only has the name, position, experience and
+    salary, so this is calculate_resume_score without the points for
+    education, skills and details. Returns None when the card had
+    nothing to score, the resume can't be judged before it is fetched.
+    """
+
+    if card.preview is None:
+        return None
+
+    return calculate_resume_score(card.preview)
+
+
+def card_score_upper_bound(card: ResumeCard) -> Optional[float]:
+    """
+    Highest score the resume behind a listing card could get.
+
+    Experience points are known from the card, completeness and skills
+    are assumed to be maxed out. Returns None when the card doesn't show
+    the experience, so the resume can't be ruled out.
+    """
+
+    if card.preview is None or card.preview.experience_years is None:
+        return None
+
+    return min(card.preview.experience_years * 5, 50) + 30 + 20
+
+
+def predict_card_score(
+    card: ResumeCard, keywords: Iterable[str] = ()
+) -> Optional[float]:
+    """
+    Priority of a listing card in the crawl frontier.
+
+    Starts from calculate_card_score and adds up to 5 points for a
+    stated salary and up to 20 points for the share of the search
+    keywords found in the position. Returns None for cards without
+    a preview.
+    """
+
+    score = calculate_card_score(card)
+    if score is None:
+        return None
+
+    if card.preview.salary:
+        score += 5
+
+    keywords = [keyword.lower() for keyword in keywords]
+    if keywords:
+        position = (card.preview.position or "").lower()
+        matched = sum(keyword in position for keyword in keywords)
+        score += matched / len(keywords) * 20
+
+    return score
+
+
+def card_priority(card: ResumeCard, keywords: Iterable[str] = ()) -> float:
+    """
+    Order in which listing cards are fetched, highest first.
+
+    This is predict_card_score, shared by the two-phase crawl and the
+    crawl frontier. Cards without a preview can't be judged before
+    their detail page is fetched, they go after every scored card.
+    """
+
+    score = predict_card_score(card, keywords)
+    return float("-inf") if score is None else score
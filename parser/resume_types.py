@@ -39,3 +39,18 @@ class Resume:
     languages: Optional[List[Language]]
     url: str
     score: Optional[float] = None
+    fingerprint: Optional[str] = None
+
+
+@dataclass
+class ResumeCard:
+    url: str
+    fingerprint: Optional[str] = None
+    preview: Optional[Resume] = None
+
+
+@dataclass
+class ListingPage:
+    url: str
+    cards: List[ResumeCard]
+    next_url: Optional[str]
@@ -0,0 +1,75 @@
+// Collects every field of a robota.ua resume page in a single call.
+// Executed through WebDriver.execute_script, so it is a function body
+// and must end with a return statement. Values are returned as raw
+// text; conversion happens in parser/robota_ua/script_extractor.py.
+
+const SELECTORS = {
+    fullName: "h1.santa-typo-h2.santa-text-black-700",
+    position: ".santa-mt-10.santa-typo-secondary.santa-text-black-700",
+    experienceGeneral: "span.santa-text-red-500.santa-whitespace-nowrap",
+    job: "div.santa-mt-20.santa-mb-20",
+    jobPosition:
+        "h4.santa-typo-regular-bold.santa-text-black-700" +
+        ".santa-sentence-case.santa-mb-20",
+    jobCompany: "p.santa-typo-regular.santa-text-black-700",
+    jobCompanyType: "p.santa-typo-secondary.santa-text-black-500",
+    jobPeriod: "p.santa-typo-regular.santa-text-black-700.santa-mr-10",
+    jobDescription:
+        '[class~="santa-pt-20"][class~="700:santa-pt-10"]' +
+        '[class~="santa-typo-regular"][class~="santa-break-words"]' +
+        '[class~="santa-list"]',
+    educationSection: "alliance-shared-ui-prof-resume-education section",
+    education: "div.santa-mb-20",
+    educationName:
+        "h4.santa-typo-regular-bold.santa-text-black-700.santa-mb-20",
+    educationType:
+        "p.santa-typo-regular.santa-text-black-700.santa-sentence-case",
+    educationPlace:
+        "p.santa-typo-regular.santa-text-black-700" +
+        ".santa-list.santa-sentence-case",
+    language: "div.language-item.santa-mb-20",
+    languageName:
+        "h4.santa-typo-regular-bold.santa-text-black-700.santa-mb-10",
+    languageLevel:
+        "p.santa-typo-regular.santa-text-black-700" +
+        ".santa-whitespace-nowrap.santa-sentence-case",
+    details: "div.santa-m-0.santa-mb-20",
+    location:
+        "div.santa-flex.santa-items-start.santa-justify-start.santa-mb-10",
+    salary: "p.santa-flex.santa-items-center.santa-mb-10",
+};
+
+const text = (root, selector) => {
+    const element = root.querySelector(selector);
+    return element ? element.innerText.trim() : null;
+};
+const all = (root, selector) => Array.from(root.querySelectorAll(selector));
+
+const educationSection = document.querySelector(SELECTORS.educationSection);
+
+return {
+    full_name: text(document, SELECTORS.fullName),
+    position: text(document, SELECTORS.position),
+    experience_general: text(document, SELECTORS.experienceGeneral),
+    experience: all(document, SELECTORS.job).map((job) => ({
+        position: text(job, SELECTORS.jobPosition),
+        company: text(job, SELECTORS.jobCompany),
+        company_type: text(job, SELECTORS.jobCompanyType),
+        period: text(job, SELECTORS.jobPeriod),
+        description: text(job, SELECTORS.jobDescription),
+    })),
+    education: educationSection
+        ? all(educationSection, SELECTORS.education).map((element) => ({
+              name: text(element, SELECTORS.educationName),
+              type_education: text(element, SELECTORS.educationType),
+              place: text(element, SELECTORS.educationPlace),
+          }))
+        : null,
+    languages: all(document, SELECTORS.language).map((element) => ({
+        name: text(element, SELECTORS.languageName),
+        level: text(element, SELECTORS.languageLevel),
+    })),
+    details: text(document, SELECTORS.details),
+    location: text(document, SELECTORS.location),
+    salary: text(document, SELECTORS.salary),
+};
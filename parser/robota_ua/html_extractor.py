@@ -0,0 +1,216 @@
+from typing import List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, Tag
+
+from parser.html_utils import (
+    element_lines,
+    element_text,
+    make_soup,
+    text_fingerprint,
+)
+from parser.resume_types import (
+    Resume,
+    Experience,
+    Education,
+    Language,
+    ListingPage,
+    ResumeCard,
+)
+from parser.utils import (
+    convert_experience,
+    convert_salary,
+    find_experience,
+    find_salary,
+)
+
+EDUCATION_SECTION_SELECTOR = "alliance-shared-ui-prof-resume-education section"
+DESCRIPTION_SELECTOR = (
+    '[class~="santa-pt-20"][class~="700:santa-pt-10"]'
+    '[class~="santa-typo-regular"][class~="santa-break-words"]'
+    '[class~="santa-list"]'
+)
+
+
+def select_text(element: Tag, selector: str) -> Optional[str]:
+    return element_text(element.select_one(selector))
+
+
+def extract_language(element: Tag) -> Language:
+    return Language(
+        name=select_text(
+            element,
+            "h4.santa-typo-regular-bold.santa-text-black-700.santa-mb-10",
+        ),
+        level=select_text(
+            element,
+            (
+                "p.santa-typo-regular.santa-text-black-700."
+                "santa-whitespace-nowrap.santa-sentence-case"
+            ),
+        ),
+    )
+
+
+def extract_experience(job_element: Tag) -> Experience:
+    period = select_text(
+        job_element, "p.santa-typo-regular.santa-text-black-700.santa-mr-10"
+    )
+
+    return Experience(
+        position=select_text(
+            job_element,
+            (
+                "h4.santa-typo-regular-bold.santa-text-black-700."
+                "santa-sentence-case.santa-mb-20"
+            ),
+        ),
+        company=select_text(
+            job_element, "p.santa-typo-regular.santa-text-black-700"
+        ),
+        company_type=select_text(
+            job_element, "p.santa-typo-secondary.santa-text-black-500"
+        ),
+        description=select_text(job_element, DESCRIPTION_SELECTOR),
+        years=convert_experience(period or ""),
+    )
+
+
+def extract_education(element: Tag) -> Education:
+    location, year = select_text(
+        element,
+        (
+            "p.santa-typo-regular.santa-text-black-700."
+            "santa-list.santa-sentence-case"
+        ),
+    ).split(", ")
+
+    return Education(
+        name=select_text(
+            element,
+            "h4.santa-typo-regular-bold.santa-text-black-700.santa-mb-20",
+        ),
+        type_education=select_text(
+            element,
+            "p.santa-typo-regular.santa-text-black-700.santa-sentence-case",
+        ),
+        location=location,
+        year=int(year),
+    )
+
+
+def extract_resume(html: str, url: str) -> Optional[Resume]:
+    soup = make_soup(html)
+
+    full_name = select_text(soup, "h1.santa-typo-h2.santa-text-black-700")
+    if full_name is None:
+        return None
+
+    experience_general = select_text(
+        soup, "span.santa-text-red-500.santa-whitespace-nowrap"
+    )
+
+    education_section = soup.select_one(EDUCATION_SECTION_SELECTOR)
+    if education_section:
+        education = [
+            extract_education(element)
+            for element in education_section.select("div.santa-mb-20")
+        ]
+    else:
+        education = None
+
+    return Resume(
+        full_name=full_name,
+        position=select_text(
+            soup, ".santa-mt-10.santa-typo-secondary.santa-text-black-700"
+        ),
+        experience_years=(
+            convert_experience(experience_general)
+            if experience_general
+            else None
+        ),
+        experience=[
+            extract_experience(job)
+            for job in soup.select("div.santa-mt-20.santa-mb-20")
+        ],
+        languages=[
+            extract_language(element)
+            for element in soup.select("div.language-item.santa-mb-20")
+        ],
+        details=select_text(soup, "div.santa-m-0.santa-mb-20"),
+        skills=None,
+        salary=convert_salary(
+            select_text(soup, "p.santa-flex.santa-items-center.santa-mb-10")
+        ),
+        location=select_text(
+            soup,
+            "div.santa-flex.santa-items-start.santa-justify-start.santa-mb-10",
+        ),
+        education=education,
+        url=url,
+    )
+
+
+def extract_card_preview(card: Tag, url: str) -> Resume:
+    lines = element_lines(card)
+
+    return Resume(
+        full_name=select_text(card, "p.santa-typo-regular-bold"),
+        position=select_text(card, "p.santa-typo-h3"),
+        experience_years=find_experience(lines),
+        experience=None,
+        education=None,
+        skills=None,
+        details=None,
+        location=None,
+        salary=find_salary(lines),
+        languages=None,
+        url=url,
+    )
+
+
+def find_resume_cards(
+    soup: BeautifulSoup, page_url: str
+) -> List[ResumeCard]:
+    resumes_section = soup.select_one("div.santa-space-y-10")
+    if not resumes_section:
+        return []
+
+    cards = []
+    for link in resumes_section.select("a.santa-no-underline[href]"):
+        card = link.find_parent("section") or link
+        url = urljoin(page_url, link["href"])
+        cards.append(
+            ResumeCard(
+                url=url,
+                fingerprint=text_fingerprint(element_text(card)),
+                preview=extract_card_preview(card, url),
+            )
+        )
+
+    return cards
+
+
+def find_next_page_url(soup: BeautifulSoup, page_url: str) -> Optional[str]:
+    next_button = soup.select_one("a.side-btn.next[href]")
+    if next_button:
+        return urljoin(page_url, next_button["href"])
+
+    pagination_elements = soup.select("nav.santa-flex a")
+
+    for i, element in enumerate(pagination_elements[:-1]):
+        if "active" in " ".join(element.get("class", [])):
+            next_page = pagination_elements[i + 1].get("href")
+            return urljoin(page_url, next_page) if next_page else None
+
+    return None
+
+
+def extract_listing_page(html: str, url: str) -> ListingPage:
+    soup = make_soup(html)
+
+    return ListingPage(
+        url=url,
+        cards=find_resume_cards(soup, url),
+        next_url=find_next_page_url(soup, url),
+    )
@@ -1,7 +1,7 @@
 import json
 import logging
 import os
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 from urllib.parse import quote, urlencode
 
 from dotenv import load_dotenv
@@ -9,20 +9,28 @@ from selenium.common import (
     NoSuchElementException,
     StaleElementReferenceException,
     TimeoutException,
+    WebDriverException,
 )
 from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 from logging_config import setup_logging
 from parser.abstract_parser import AbstractResumeParser
-from parser.relevance import calculate_resume_score
+from parser.browser_service import BrowserService, SessionStore
+from parser.checkpoint import CrawlStateStore
+from parser.html_cache import CacheMiss, HtmlCache
+from parser.html_utils import text_fingerprint
+from parser.scheduler import PolitenessScheduler
 from parser.resume_types import (
     Resume,
     Experience,
     Education,
     Language,
+    ListingPage,
+    ResumeCard,
 )
 from parser.robota_ua.utils import (
     RobotaSearchType,
@@ -30,39 +38,138 @@ from parser.robota_ua.utils import (
     RobotaExperienceLevel,
     RobotaPostingPeriod,
 )
-from parser.utils import convert_salary, convert_experience
+from parser.robota_ua import html_extractor
+from parser.robota_ua.script_extractor import (
+    EXTRACT_RESUME_SCRIPT,
+    resume_from_dict,
+)
+from parser.utils import ExtractionMode, convert_salary, convert_experience
 
 load_dotenv()
 EMAIL = os.getenv("EMAIL")
 PASSWORD = os.getenv("PASSWORD")
+SESSION_PATH = os.getenv("ROBOTA_SESSION_PATH", "robota_session.json")
+LOGGED_IN_LOCATOR = (By.CSS_SELECTOR, "div.santa-pl-10.santa-hidden")
+
+sessions = SessionStore(SESSION_PATH)
 
 setup_logging("robota_ua_parser.log")
 
 
 class RobotaUaParser(AbstractResumeParser):
+    SITE = "robota.ua"
     BASE_URL = "https://robota.ua/candidates/"
 
-    def __init__(self):
-        super().__init__()
-        self.login(email=EMAIL, password=PASSWORD)
+    def __init__(
+            self,
+            workers: int = 1,
+            extraction_mode: ExtractionMode = ExtractionMode.SCRIPT,
+            prefetch_pages: int = 0,
+            cache: Optional[HtmlCache] = None,
+            scheduler: Optional[PolitenessScheduler] = None,
+            checkpoints: Optional[CrawlStateStore] = None,
+            known_resumes: Optional[
+                Callable[[List[str]], Dict[str, Resume]]
+            ] = None,
+            detail_top_k: Optional[int] = None,
+            detail_min_score: Optional[float] = None,
+            frontier_lookahead: int = 0,
+            browsers: Optional[BrowserService] = None,
+    ):
+        super().__init__(
+            workers,
+            extraction_mode,
+            prefetch_pages,
+            cache,
+            scheduler,
+            checkpoints,
+            known_resumes,
+            detail_top_k,
+            detail_min_score,
+            frontier_lookahead,
+            browsers,
+        )
+
+    @classmethod
+    def create_browser(cls) -> WebDriver:
+        """
+        Start a browser logged in to robota.ua.
+
+        The saved session cookies are tried first, the login flow only
+        runs when there is no saved session or it has expired.
+        """
+
+        driver = super().create_browser()
+        if not cls.restore_session(driver):
+            cls.log_in(driver, EMAIL, PASSWORD)
+            sessions.save(driver.get_cookies())
+        return driver
+
+    @staticmethod
+    def restore_session(driver: WebDriver) -> bool:
+        cookies = sessions.load()
+        if not cookies:
+            return False
+
+        driver.get("https://robota.ua/")
+        for cookie in cookies:
+            try:
+                driver.add_cookie(cookie)
+            except WebDriverException as e:
+                logging.error(f"Error restoring robota.ua cookie: {e}")
+
+        if not RobotaUaParser.is_logged_in(driver):
+            logging.info("Saved robota.ua session has expired")
+            sessions.clear()
+            driver.delete_all_cookies()
+            return False
+
+        return True
+
+    @staticmethod
+    def is_logged_in(driver: WebDriver) -> bool:
+        driver.get("https://robota.ua/")
+        try:
+            WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located(LOGGED_IN_LOCATOR)
+            )
+        except TimeoutException:
+            return False
+        return True
+
+    @classmethod
+    def ensure_logged_in(cls, driver: WebDriver) -> None:
+        """
+        Log a started browser in again if its session has expired,
+        e.g. while it sat idle in BrowserService.
+        """
+
+        if cls.is_logged_in(driver):
+            return
 
-    def __del__(self):
-        self.driver.quit()
+        logging.info("robota.ua session has expired, logging in again")
+        sessions.clear()
+        driver.delete_all_cookies()
+        cls.log_in(driver, EMAIL, PASSWORD)
+        sessions.save(driver.get_cookies())
 
-    def login(self, email, password):
+    def login(self, email, password, driver: Optional[WebDriver] = None):
+        self.log_in(driver or self.driver, email, password)
 
-        self.driver.get("https://robota.ua/auth/login")
+    @staticmethod
+    def log_in(driver: WebDriver, email, password):
+        driver.get("https://robota.ua/auth/login")
 
-        WebDriverWait(self.driver, 10).until(
+        WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.ID, "otp-username"))
         )
-        self.driver.find_element(By.ID, "otp-username").send_keys(email)
+        driver.find_element(By.ID, "otp-username").send_keys(email)
 
-        self.driver.find_element(
+        driver.find_element(
             By.XPATH, '//*[contains(@id, "santa-input-")]'
         ).send_keys(password)
 
-        self.driver.find_element(
+        driver.find_element(
             By.CSS_SELECTOR,
             (
                 "button.primary-large.santa-block."
@@ -70,57 +177,70 @@ class RobotaUaParser(AbstractResumeParser):
             ),
         ).click()
 
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "div.santa-pl-10.santa-hidden")
-            )
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located(LOGGED_IN_LOCATOR)
         )
 
-    def get_next_page_url(self, url: str) -> Optional[str]:
-        self.driver.get(url)
-
+    def find_next_page_url(self) -> Optional[str]:
         try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "nav.santa-flex a")
-                )
+            next_button = self.driver.find_element(
+                By.CSS_SELECTOR, "a.side-btn.next"
             )
+            return next_button.get_attribute("href")
+        except NoSuchElementException:
+            pass
 
-            try:
-                next_button = self.driver.find_element(
-                    By.CSS_SELECTOR, "a.side-btn.next"
-                )
-                return next_button.get_attribute("href")
-            except NoSuchElementException:
-                pass
+        pagination_elements = self.driver.find_elements(
+            By.CSS_SELECTOR, "nav.santa-flex a"
+        )
+
+        current_page = None
+
+        for i, element in enumerate(pagination_elements):
+            if "active" in element.get_attribute("class"):
+                current_page = i
+                break
 
-            pagination_elements = self.driver.find_elements(
-                By.CSS_SELECTOR, "nav.santa-flex a"
+        if current_page is not None and current_page + 1 < len(
+                pagination_elements
+        ):
+            return pagination_elements[current_page + 1].get_attribute(
+                "href"
             )
 
-            current_page = None
+        return None
 
-            for i, element in enumerate(pagination_elements):
-                if "active" in element.get_attribute("class"):
-                    current_page = i
-                    break
+    def parse_listing_page(self, url: str) -> ListingPage:
+        page = self.extract_from_cache(
+            url, html_extractor.extract_listing_page
+        )
+        if page:
+            return page
 
-            if current_page is not None and current_page + 1 < len(
-                    pagination_elements
-            ):
-                return pagination_elements[current_page + 1].get_attribute(
-                    "href"
-                )
+        self.open_page(url, (By.CSS_SELECTOR, "section.cv-card"), 10)
 
-        except TimeoutException:
-            logging.error("Timeout waiting for pagination elements to load")
-        except Exception as e:
-            logging.error(
-                "An error occurred while trying "
-                f"to find the next page URL: {e}"
+        if self.extraction_mode != ExtractionMode.LIVE:
+            return self.extract_snapshot(
+                html_extractor.extract_listing_page, url
             )
 
-        return None
+        resumes_section = self.driver.find_element(
+            By.CSS_SELECTOR, "div.santa-space-y-10"
+        )
+
+        return ListingPage(
+            url=url,
+            cards=[
+                ResumeCard(
+                    url=resume.get_attribute("href"),
+                    fingerprint=text_fingerprint(resume.text),
+                )
+                for resume in resumes_section.find_elements(
+                    By.CSS_SELECTOR, "a.santa-no-underline"
+                )
+            ],
+            next_url=self.find_next_page_url(),
+        )
 
     def get_element_text(
             self,
@@ -235,14 +355,37 @@ class RobotaUaParser(AbstractResumeParser):
         )
 
     def parse_single_resume(self, url: str) -> Optional[Resume]:
-        self.driver.get(url)
-
-        WebDriverWait(self.driver, 30).until(
-            EC.presence_of_element_located(
-                (By.CLASS_NAME, "santa-typo-h2.santa-text-black-700")
+        try:
+            resume = self.extract_from_cache(
+                url, html_extractor.extract_resume
             )
+        except CacheMiss:
+            logging.info(f"Resume is not in the replay cache: {url}")
+            return None
+
+        if resume:
+            return resume
+
+        self.open_page(
+            url, (By.CLASS_NAME, "santa-typo-h2.santa-text-black-700"), 30
         )
 
+        if self.extraction_mode == ExtractionMode.SCRIPT:
+            try:
+                resume = resume_from_dict(
+                    self.driver.execute_script(EXTRACT_RESUME_SCRIPT), url
+                )
+            except Exception as e:
+                logging.error(f"Error running extraction script {url}: {e}")
+                return None
+
+            if resume and self.cache is not None:
+                self.store_page(url, self.driver.page_source)
+            return resume
+
+        if self.extraction_mode == ExtractionMode.SNAPSHOT:
+            return self.extract_snapshot(html_extractor.extract_resume, url)
+
         try:
             full_name = self.get_element_text(
                 By.CSS_SELECTOR, "h1.santa-typo-h2.santa-text-black-700"
@@ -341,43 +484,6 @@ class RobotaUaParser(AbstractResumeParser):
             logging.error(f"Error parsing single resume: {str(e)}")
             return None
 
-    def parse_single_page(self, url: str) -> List[Resume]:
-        self.driver.get(url)
-
-        resumes = []
-
-        try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "section.cv-card")
-                )
-            )
-
-            resumes_section = self.driver.find_element(
-                By.CSS_SELECTOR, "div.santa-space-y-10"
-            )
-
-            resume_links = resumes_section.find_elements(
-                By.CSS_SELECTOR, "a.santa-no-underline"
-            )
-
-            resume_links = [
-                resume.get_attribute("href") for resume in resume_links
-            ]
-
-            for resume_link in resume_links:
-
-                resume = self.parse_single_resume(resume_link)
-
-                resume.score = calculate_resume_score(resume)
-
-                if resume:
-                    resumes.append(resume)
-
-        except Exception as e:
-            logging.error(f"Error parsing page: {str(e)}")
-        return resumes
-
     def build_url(
             self,
             position: str,
@@ -424,7 +530,7 @@ class RobotaUaParser(AbstractResumeParser):
 
         return f"{base_url}?{urlencode(params)}" if params else base_url
 
-    def parse_resumes(
+    def build_search_url(
             self,
             position: str,
             search_type: RobotaSearchType = RobotaSearchType.SYNONYMS,
@@ -436,9 +542,9 @@ class RobotaUaParser(AbstractResumeParser):
             public_period: RobotaPostingPeriod = (
                 RobotaPostingPeriod.THREE_MONTHS
             ),
-    ) -> List[Resume]:
+    ) -> str:
 
-        url = self.build_url(
+        return self.build_url(
             position,
             search_type,
             city,
@@ -448,15 +554,3 @@ class RobotaUaParser(AbstractResumeParser):
             experience,
             public_period,
         )
-
-        resumes = self.parse_single_page(url)
-
-        while True:
-            url = self.get_next_page_url(url)
-
-            if url:
-                resumes.extend(self.parse_single_page(url))
-            else:
-                break
-
-        return resumes
@@ -0,0 +1,61 @@
+from pathlib import Path
+from typing import Optional
+
+from parser.resume_types import Resume, Experience, Education, Language
+from parser.utils import convert_experience, convert_salary
+
+EXTRACT_RESUME_SCRIPT = (
+    Path(__file__).with_name("extract_resume.js").read_text(encoding="utf-8")
+)
+
+
+def education_from_dict(data: dict) -> Education:
+    location, year = data["place"].split(", ")
+
+    return Education(
+        name=data["name"],
+        type_education=data["type_education"],
+        location=location,
+        year=int(year),
+    )
+
+
+def resume_from_dict(data: dict, url: str) -> Optional[Resume]:
+    if not data or not data.get("full_name"):
+        return None
+
+    experience_general = data.get("experience_general")
+
+    education = data.get("education")
+    if education is not None:
+        education = [education_from_dict(item) for item in education]
+
+    return Resume(
+        full_name=data["full_name"],
+        position=data.get("position"),
+        experience_years=(
+            convert_experience(experience_general)
+            if experience_general
+            else None
+        ),
+        experience=[
+            Experience(
+                position=job["position"],
+                company=job["company"],
+                company_type=job["company_type"],
+                description=job["description"],
+                years=convert_experience(job["period"] or ""),
+            )
+            for job in data.get("experience", [])
+        ],
+        languages=[
+            Language(name=language["name"], level=language["level"])
+            for language in data.get("languages", [])
+        ],
+        details=data.get("details"),
+        skills=None,
+        salary=convert_salary(data.get("salary")),
+        location=data.get("location"),
+        education=education,
+        url=url,
+    )
@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+
+        now = time.monotonic()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        self.tokens -= 1
+
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class AimdController:
+    """
+    Additive-increase/multiplicative-decrease limit of in-flight fetches.
+
+    Every fast successful fetch grows the limit by about one per window
+    of completed requests, every error, throttle or slow page cuts it.
+    """
+
+    def __init__(
+        self,
+        initial: float = 2,
+        minimum: float = 1,
+        maximum: float = 16,
+        decrease_factor: float = 0.5,
+        slow_latency: float = 10.0,
+    ):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.slow_latency = slow_latency
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.slow_latency:
+            self.on_congestion()
+            return
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_congestion(self) -> None:
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+
+class HostState:
+    def __init__(self, rate: float, burst: float, controller: AimdController):
+        self.bucket = TokenBucket(rate, burst)
+        self.controller = controller
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.backoff_until = 0.0
+        self.throttles = 0
+        self.completed = deque()
+        self.failures = deque()
+
+
+class Throttled(Exception):
+    """A fetch kept being rate limited after the scheduler's backoff."""
+
+    def __init__(self, url: str, retry_after: Optional[float] = None):
+        super().__init__(f"Throttled: {url}")
+        self.url = url
+        self.retry_after = retry_after
+
+
+class FetchTicket:
+    def __init__(self):
+        self.throttled = False
+        self.retry_after: Optional[float] = None
+        self.failed = False
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        """Mark the fetch as rate limited: a 429, a captcha or similar."""
+
+        self.throttled = True
+        self.retry_after = retry_after
+
+    def fail(self) -> None:
+        self.failed = True
+
+
+class PolitenessScheduler:
+    """
+    Per-host gate between the parsers and the network or the browser.
+
+    Each host gets a token bucket for the request rate, an AIMD limit
+    for concurrent fetches and an exponential backoff that is triggered
+    by throttled fetches and honours Retry-After.
+    """
+
+    STATS_WINDOW = 60.0
+
+    def __init__(
+        self,
+        rate: float = 2.0,
+        burst: float = 4,
+        host_rates: Optional[Dict[str, float]] = None,
+        max_concurrency: float = 16,
+        slow_latency: float = 10.0,
+        base_backoff: float = 5.0,
+        max_backoff: float = 300.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.host_rates = host_rates or {}
+        self.max_concurrency = max_concurrency
+        self.slow_latency = slow_latency
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hosts: Dict[str, HostState] = {}
+        self.lock = threading.Lock()
+
+    def get_host(self, url: str) -> HostState:
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostState(
+                    rate=self.host_rates.get(host, self.rate),
+                    burst=self.burst,
+                    controller=AimdController(
+                        maximum=self.max_concurrency,
+                        slow_latency=self.slow_latency,
+                    ),
+                )
+            return self.hosts[host]
+
+    @contextmanager
+    def request(self, url: str) -> Iterator[FetchTicket]:
+        state = self.get_host(url)
+        self.wait_for_slot(state)
+
+        ticket = FetchTicket()
+        started_at = time.monotonic()
+        try:
+            yield ticket
+        except Exception:
+            ticket.fail()
+            raise
+        finally:
+            self.finish(state, ticket, time.monotonic() - started_at)
+
+    def wait_for_slot(self, state: HostState) -> None:
+        with state.condition:
+            state.waiting += 1
+            try:
+                while True:
+                    delay = state.backoff_until - time.monotonic()
+                    if delay > 0:
+                        state.condition.wait(delay)
+                        continue
+
+                    if state.in_flight < int(state.controller.limit):
+                        break
+                    state.condition.wait()
+
+                state.in_flight += 1
+                delay = state.bucket.reserve()
+            finally:
+                state.waiting -= 1
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def finish(
+        self, state: HostState, ticket: FetchTicket, latency: float
+    ) -> None:
+        now = time.monotonic()
+        with state.condition:
+            state.in_flight -= 1
+            state.completed.append(now)
+
+            if ticket.throttled:
+                state.throttles += 1
+                backoff = ticket.retry_after or min(
+                    self.max_backoff,
+                    self.base_backoff * 2 ** (state.throttles - 1),
+                )
+                state.backoff_until = max(state.backoff_until, now + backoff)
+                state.controller.on_congestion()
+                state.failures.append(now)
+                logging.warning(f"Throttled, backing off for {backoff:.1f}s")
+            elif ticket.failed:
+                state.controller.on_congestion()
+                state.failures.append(now)
+            else:
+                state.throttles = 0
+                state.controller.on_success(latency)
+
+            self.trim(state, now)
+            state.condition.notify_all()
+
+    def trim(self, state: HostState, now: float) -> None:
+        for events in (state.completed, state.failures):
+            while events and now - events[0] > self.STATS_WINDOW:
+                events.popleft()
+
+    def stats(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        stats = {}
+
+        with self.lock:
+            hosts = dict(self.hosts)
+
+        for host, state in hosts.items():
+            with state.condition:
+                self.trim(state, now)
+                completed = len(state.completed)
+                stats[host] = {
+                    "rate": completed / self.STATS_WINDOW,
+                    "error_rate": (
+                        len(state.failures) / completed if completed else 0.0
+                    ),
+                    "in_flight": state.in_flight,
+                    "queue_depth": state.waiting,
+                    "concurrency_limit": state.controller.limit,
+                    "backoff": max(0.0, state.backoff_until - now),
+                }
+
+        return stats
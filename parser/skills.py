@@ -0,0 +1,52 @@
+from typing import Iterable, List, Optional
+
+SKILL_SYNONYMS = {
+    "js": "javascript",
+    "java script": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "python 3": "python",
+    "golang": "go",
+    "nodejs": "node.js",
+    "node": "node.js",
+    "node js": "node.js",
+    "reactjs": "react",
+    "react.js": "react",
+    "vuejs": "vue",
+    "vue.js": "vue",
+    "angularjs": "angular",
+    "postgres": "postgresql",
+    "postgre sql": "postgresql",
+    "ms sql": "mssql",
+    "sql server": "mssql",
+    "mongo": "mongodb",
+    "k8s": "kubernetes",
+    "drf": "django rest framework",
+    "c sharp": "c#",
+    "dotnet": ".net",
+    "ml": "machine learning",
+    "английский": "англійська",
+    "english": "англійська",
+    "ms excel": "excel",
+    "microsoft excel": "excel",
+}
+
+
+def skill_key(skill: str) -> Optional[str]:
+    """
+    Canonical form of a skill: lowercase, single spaces, synonyms folded
+    into one name, so "Postgres" and "PostgreSQL" count as one skill.
+    """
+
+    key = " ".join(skill.lower().split()).strip(" ,;:")
+    if not key:
+        return None
+    return SKILL_SYNONYMS.get(key, key)
+
+
+def skill_keys(skills: Optional[Iterable[str]]) -> List[str]:
+    """Distinct canonical skills, in their first-seen order."""
+
+    keys = (skill_key(skill) for skill in skills or [])
+    return list(dict.fromkeys(key for key in keys if key))
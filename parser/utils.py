@@ -1,7 +1,12 @@
+import json
+import logging
 import os
 import re
+import threading
+import time
 from enum import Enum
-from typing import Optional
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
 
 import requests
 from dotenv import load_dotenv
@@ -28,18 +33,141 @@ class BaseEnum(Enum):
         return self.value[1]
 
 
-def get_exchange_rate(from_currency, to_currency) -> float:
-    url = (
-        f"https://v6.exchangerate-api.com/v6/{API_KEY}/latest/{from_currency}"
-    )
-    response = requests.get(url)
-    data = response.json()
+class ExtractionMode(Enum):
+    LIVE = "live"
+    SNAPSHOT = "snapshot"
+    SCRIPT = "script"
+
+
+class ExchangeRateProvider:
+    """
+    Keeps the exchange-rate table of exchangerate-api in memory and on disk.
+
+    The full conversion_rates table for base_currency is fetched at most
+    once per ttl, so converting a salary is a dictionary lookup. When
+    the API can't be reached the last known rates are used.
+    """
+
+    API_URL = "https://v6.exchangerate-api.com/v6/{api_key}/latest/{base}"
+
+    def __init__(
+        self,
+        base_currency: str = "UAH",
+        ttl: float = 12 * 3600,
+        retry_interval: float = 300,
+        cache_path: Optional[str] = "exchange_rates.json",
+        timeout: float = 10,
+    ):
+        self.base_currency = base_currency
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.cache_path = cache_path
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.rates: Optional[Dict[str, float]] = None
+        self.fetched_at = 0.0
+        self.retry_at = 0.0
+        self.load()
+
+    def load(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with open(self.cache_path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading exchange rates cache: {e}")
+            return
+
+        if data.get("base") == self.base_currency:
+            self.rates = data["rates"]
+            self.fetched_at = data["fetched_at"]
+
+    def save(self) -> None:
+        if not self.cache_path:
+            return
+
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "base": self.base_currency,
+                        "fetched_at": self.fetched_at,
+                        "rates": self.rates,
+                    },
+                    file,
+                )
+        except OSError as e:
+            logging.error(f"Error writing exchange rates cache: {e}")
+
+    def fetch(self) -> Dict[str, float]:
+        response = self.session.get(
+            self.API_URL.format(api_key=API_KEY, base=self.base_currency),
+            timeout=self.timeout,
+        )
+        data = response.json()
+
+        if response.status_code == 200 and data["result"] == "success":
+            return data["conversion_rates"]
 
-    if response.status_code == 200 and data["result"] == "success":
-        return data["conversion_rates"][to_currency]
-    else:
         raise Exception(f"Error fetching exchange rate: {data['error-type']}")
 
+    def get_rates(self) -> Dict[str, float]:
+        with self.lock:
+            now = time.time()
+            if self.rates and now - self.fetched_at < self.ttl:
+                return self.rates
+
+            if now < self.retry_at:
+                if self.rates:
+                    return self.rates
+                raise Exception("Exchange rates are unavailable")
+
+            try:
+                self.rates = self.fetch()
+                self.fetched_at = now
+                self.save()
+            except Exception as e:
+                self.retry_at = now + self.retry_interval
+                if not self.rates:
+                    raise
+
+                logging.error(f"Using last known exchange rates: {e}")
+
+            return self.rates
+
+    def get_exchange_rate(self, from_currency: str, to_currency: str) -> float:
+        rates = self.get_rates()
+        return rates[to_currency] / rates[from_currency]
+
+    def convert(
+        self, amount: float, from_currency: str, to_currency: str = "UAH"
+    ) -> float:
+        if from_currency == to_currency:
+            return amount
+        return amount * self.get_exchange_rate(from_currency, to_currency)
+
+
+exchange_rates = ExchangeRateProvider()
+
+CURRENCIES = {
+    "$": "USD",
+    "USD": "USD",
+    "€": "EUR",
+    "EUR": "EUR",
+    "грн": "UAH",
+    "UAH": "UAH",
+}
+SALARY_PATTERN = re.compile(
+    r"(\d+)(" + "|".join(re.escape(symbol) for symbol in CURRENCIES) + ")"
+)
+
+
+def get_exchange_rate(from_currency, to_currency) -> float:
+    return exchange_rates.get_exchange_rate(from_currency, to_currency)
+
 
 def convert_salary(salary_element) -> Optional[float]:
     if not salary_element:
@@ -47,18 +175,20 @@ def convert_salary(salary_element) -> Optional[float]:
 
     salary_element = salary_element.replace(" ", "")
 
-    pattern = r"(\d+)(\$|грн)"
-    match = re.search(pattern, salary_element)
+    match = SALARY_PATTERN.search(salary_element)
 
     if match:
         amount = int(match.group(1))
-        currency = match.group(2)
+        currency = CURRENCIES[match.group(2)]
 
-        if currency == "$":
-            exchange_rate = get_exchange_rate("USD", "UAH")
-            amount = round(amount * exchange_rate, 2)
+        if currency == "UAH":
+            return amount
 
-        return amount
+        try:
+            return round(exchange_rates.convert(amount, currency), 2)
+        except Exception as e:
+            logging.error(f"Error converting salary {salary_element}: {e}")
+            return None
 
     return None
 
@@ -75,3 +205,42 @@ def convert_experience(experience_str: str | None) -> float:
 
     total_years = years + (months / 12)
     return round(total_years, 1)
+
+
+def find_salary(lines: Iterable[str]) -> Optional[float]:
+    """Return the first salary found in lines of listing card text."""
+
+    for line in lines:
+        salary = convert_salary(line)
+        if salary is not None:
+            return salary
+
+    return None
+
+
+def find_experience(lines: Iterable[str]) -> Optional[float]:
+    """Return the years of experience from a "Досвід ..." card line."""
+
+    for line in lines:
+        if "досвід" in line.lower():
+            return convert_experience(line)
+
+    return None
+
+
+def resume_key(url: str) -> str:
+    """
+    Site-specific identity of a resume, such as work.ua:1234567.
+
+    The id is the first numeric segment of the URL path, so query
+    strings and trailing slugs don't matter. URLs without one are
+    their own key.
+    """
+
+    parts = urlparse(url)
+    site = parts.netloc.lower().removeprefix("www.")
+    resume_id = next(
+        (segment for segment in parts.path.split("/") if segment.isdigit()),
+        None,
+    )
+    return f"{site}:{resume_id}" if site and resume_id else url
@@ -0,0 +1,272 @@
+from typing import List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, Tag
+
+from parser.html_utils import (
+    class_equals,
+    element_lines,
+    element_text,
+    find_heading,
+    make_soup,
+    text_fingerprint,
+)
+from parser.resume_types import (
+    Resume,
+    Experience,
+    Education,
+    Language,
+    ListingPage,
+    ResumeCard,
+)
+from parser.utils import (
+    convert_experience,
+    convert_salary,
+    find_experience,
+    find_salary,
+)
+from parser.work_ua.utils import extract_text_in_parentheses, extract_city
+
+RESUME_CARD_SELECTOR = "div.card.card-hover.card-search.resume-link"
+SECTION_END_TITLES = ("Додаткова освіта та сертифікати", "Знання і навички")
+SECTION_END_SELECTOR = "div.card.mt-0.card-indent-p.hidden-print"
+
+
+def find_section_end(
+    soup: BeautifulSoup, titles: tuple = SECTION_END_TITLES
+) -> Optional[Tag]:
+    for title in titles:
+        heading = find_heading(soup, title)
+        if heading:
+            return heading
+
+    return soup.select_one(SECTION_END_SELECTOR)
+
+
+def section_elements(heading: Tag, end: Optional[Tag]) -> List[Tag]:
+    elements = []
+    for sibling in heading.find_next_siblings():
+        if sibling is end:
+            break
+        elements.append(sibling)
+    return elements
+
+
+def extract_languages(soup: BeautifulSoup) -> List[Language]:
+    languages_heading = find_heading(soup, "Знання мов")
+    if not languages_heading:
+        return []
+
+    languages_list = languages_heading.find_next_sibling("ul")
+    if languages_list:
+        items = [element_text(item) for item in languages_list("li")]
+    else:
+        items = [element_text(languages_heading.find_next_sibling("p"))]
+
+    languages = []
+    for language_text in items:
+        if not language_text:
+            continue
+        name, level = language_text.split(" — ")
+        languages.append(Language(name=name.strip(), level=level.strip()))
+
+    return languages
+
+
+def extract_experiences(soup: BeautifulSoup) -> List[Experience]:
+    experience_heading = find_heading(soup, "Досвід роботи")
+    if not experience_heading:
+        return []
+
+    end = find_section_end(soup, ("Освіта",) + SECTION_END_TITLES)
+
+    experiences = []
+    position = None
+    for element in section_elements(experience_heading, end):
+        if element.name == "h2":
+            position = element_text(element)
+
+        if class_equals(element, "mb-0"):
+            years, company_information = element_text(element).split("\n")
+
+            years = convert_experience(extract_text_in_parentheses(years))
+
+            company_information = company_information.split("(")
+
+            experiences.append(
+                Experience(
+                    position=position,
+                    company=company_information[0],
+                    company_type=company_information[-1][:-1],
+                    description=None,
+                    years=years,
+                )
+            )
+
+        if class_equals(element, "text-default-7 mb-0") and experiences:
+            experiences[-1].description = element_text(element)
+
+    return experiences
+
+
+def extract_education(soup: BeautifulSoup) -> List[Education]:
+    education_heading = find_heading(soup, "Освіта")
+    if not education_heading:
+        return []
+
+    educations = []
+    institution = None
+    try:
+        for element in section_elements(
+            education_heading, find_section_end(soup)
+        ):
+            if element.name == "h2":
+                institution = element_text(element)
+
+            if class_equals(element, "mb-0"):
+                education_information, years = element_text(element).split(
+                    "\n"
+                )
+                education_information = education_information.split(", ")
+
+                if len(education_information) == 2:
+                    education_type, location = education_information
+                elif len(education_information) == 1:
+                    education_type, location = education_information[0], None
+                else:
+                    education_type, location = (
+                        education_information[1],
+                        education_information[-1],
+                    )
+
+                educations.append(
+                    Education(
+                        name=institution,
+                        type_education=education_type,
+                        location=location,
+                        year=int(years.split()[-3]),
+                    )
+                )
+    except (ValueError, IndexError):
+        return []
+
+    return educations
+
+
+def extract_skills(soup: BeautifulSoup) -> Optional[List[str]]:
+    skills_card = soup.find("div", attrs={"class": "card wordwrap mt-0"})
+    if not skills_card:
+        return None
+
+    skills_list = skills_card.find(
+        "ul", attrs={"class": "list-unstyled my-0 flex flex-wrap"}
+    )
+    if not skills_list:
+        return None
+
+    return element_text(skills_list).split("\n")
+
+
+def extract_resume(html: str, url: str) -> Optional[Resume]:
+    soup = make_soup(html)
+
+    full_name = element_text(soup.select_one("h1.mt-0.mb-0"))
+    if full_name is None:
+        return None
+
+    position_element = element_text(soup.select_one("h2.mt-lg"), "").split(
+        ", "
+    )
+
+    if len(position_element) == 2:
+        position, salary = position_element
+    elif len(position_element) >= 3:
+        position, salary = (
+            ", ".join(position_element[:-1]),
+            position_element[-1],
+        )
+    else:
+        position, salary = "".join(position_element), None
+
+    experience = extract_experiences(soup)
+    location = element_text(soup.select_one("dl.dl-horizontal"))
+
+    return Resume(
+        full_name=full_name,
+        position=position,
+        experience_years=round(sum(exp.years for exp in experience), 1),
+        experience=experience,
+        languages=extract_languages(soup),
+        skills=extract_skills(soup),
+        details=element_text(soup.find(id="addInfo")),
+        salary=convert_salary(salary),
+        location=extract_city(location) if location else None,
+        education=extract_education(soup),
+        url=url,
+    )
+
+
+def extract_card_preview(card: Tag, url: str) -> Resume:
+    lines = element_lines(card)
+
+    return Resume(
+        full_name=element_text(card.select_one("span.strong-600")),
+        position=element_text(card.select_one("h2 a")),
+        experience_years=find_experience(lines),
+        experience=None,
+        education=None,
+        skills=None,
+        details=None,
+        location=None,
+        salary=find_salary(lines),
+        languages=None,
+        url=url,
+    )
+
+
+def find_resume_cards(
+    soup: BeautifulSoup, page_url: str
+) -> List[ResumeCard]:
+    cards = []
+    for card in soup.select(RESUME_CARD_SELECTOR):
+        link = card.find("a", href=True)
+        if link:
+            url = urljoin(page_url, link["href"])
+            cards.append(
+                ResumeCard(
+                    url=url,
+                    fingerprint=text_fingerprint(element_text(card)),
+                    preview=extract_card_preview(card, url),
+                )
+            )
+
+    return cards
+
+
+def find_next_page_url(soup: BeautifulSoup, page_url: str) -> Optional[str]:
+    if soup.select_one("li.no-style.disabled.add-left-default"):
+        return None
+
+    next_button = soup.select_one("a.link-icon")
+
+    if (
+        next_button
+        and next_button.get("href")
+        and element_text(next_button) == "Наступна"
+    ):
+        return urljoin(page_url, next_button["href"])
+
+    return None
+
+
+def extract_listing_page(html: str, url: str) -> Optional[ListingPage]:
+    soup = make_soup(html)
+
+    if not soup.find(id="pjax-resume-list"):
+        return None
+
+    return ListingPage(
+        url=url,
+        cards=find_resume_cards(soup, url),
+        next_url=find_next_page_url(soup, url),
+    )
@@ -1,28 +1,36 @@
 import logging
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 from urllib.parse import quote, urlencode
 
 from selenium.common import (
     NoSuchElementException,
-    TimeoutException,
     StaleElementReferenceException,
 )
 from selenium.webdriver import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
 from logging_config import setup_logging
 from parser.abstract_parser import AbstractResumeParser
-from parser.relevance import calculate_resume_score
+from parser.browser_service import BrowserService
+from parser.checkpoint import CrawlStateStore
+from parser.html_cache import CacheMiss, HtmlCache
+from parser.html_utils import text_fingerprint
+from parser.http_client import HttpClient
+from parser.scheduler import PolitenessScheduler
 from parser.resume_types import (
     Resume,
     Education,
     Experience,
     Language,
+    ListingPage,
+    ResumeCard,
+)
+from parser.utils import (
+    ExtractionMode,
+    convert_experience,
+    convert_salary,
 )
-from parser.utils import convert_experience, convert_salary
 from parser.work_ua.utils import (
     WorkUaCity,
     WorkUaSearchType,
@@ -32,49 +40,93 @@ from parser.work_ua.utils import (
     extract_text_in_parentheses,
     extract_city,
 )
+from parser.work_ua import html_extractor
 
 setup_logging("work_ua_parser.log")
 
 
 class WorkUaParser(AbstractResumeParser):
+    SITE = "work.ua"
     BASE_URL = "https://www.work.ua/resumes"
 
-    def get_next_page_url(self, url) -> Optional[str]:
-        self.driver.get(url)
+    def __init__(
+            self,
+            use_http: bool = True,
+            workers: int = 1,
+            extraction_mode: ExtractionMode = ExtractionMode.SNAPSHOT,
+            prefetch_pages: int = 0,
+            cache: Optional[HtmlCache] = None,
+            scheduler: Optional[PolitenessScheduler] = None,
+            checkpoints: Optional[CrawlStateStore] = None,
+            known_resumes: Optional[
+                Callable[[List[str]], Dict[str, Resume]]
+            ] = None,
+            detail_top_k: Optional[int] = None,
+            detail_min_score: Optional[float] = None,
+            frontier_lookahead: int = 0,
+            browsers: Optional[BrowserService] = None,
+    ):
+        super().__init__(
+            workers,
+            extraction_mode,
+            prefetch_pages,
+            cache,
+            scheduler,
+            checkpoints,
+            known_resumes,
+            detail_top_k,
+            detail_min_score,
+            frontier_lookahead,
+            browsers,
+        )
+        self.use_http = use_http
+        self.http = HttpClient(scheduler=scheduler) if use_http else None
+
+    def close(self) -> None:
+        super().close()
+        if self.http is not None:
+            self.http.close()
+
+    def fetch_page(self, url: str, extract: Callable, *args):
+        """
+        Fetch a server-rendered page over HTTP and run an extractor on it.
+
+        Returns None when the page can't be fetched or extracted, so the
+        caller can fall back to Selenium. A throttled fetch raises
+        Throttled instead, loading the page in the browser right away
+        would only hit the rate limit again.
+        """
+
+        html = self.http.get_text(url)
+        if html is None:
+            return None
 
         try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "a.link-icon")
-                )
-            )
-            try:
-                disabled_next_button = self.driver.find_element(
-                    By.CSS_SELECTOR,
-                    "li.no-style.disabled.add-left-default"
-                )
-            except NoSuchElementException:
-                disabled_next_button = None
-
-            next_button = self.driver.find_element(
-                By.CSS_SELECTOR, "a.link-icon"
-            )
+            result = extract(html, *args)
+        except Exception as e:
+            logging.error(f"Error extracting {url} over HTTP: {e}")
+            return None
 
-            if disabled_next_button is None and next_button.text == "Наступна":
-                return next_button.get_attribute("href")
+        if result is not None:
+            self.store_page(url, html)
+        return result
 
-            return None
+    def find_next_page_url(self) -> Optional[str]:
+        next_buttons = self.driver.find_elements(
+            By.CSS_SELECTOR, "a.link-icon"
+        )
+        disabled_next_buttons = self.driver.find_elements(
+            By.CSS_SELECTOR, "li.no-style.disabled.add-left-default"
+        )
 
-        except TimeoutException:
-            logging.error("Timeout waiting for pagination elements to load")
+        if (
+            next_buttons
+            and not disabled_next_buttons
+            and next_buttons[0].text == "Наступна"
+        ):
+            return next_buttons[0].get_attribute("href")
 
-            return None
-        except Exception as e:
-            logging.error(
-                "An error occurred while trying "
-                f"to find the next page URL: {e}"
-            )
-            return None
+        return None
 
     def get_element_text(
             self,
@@ -289,11 +341,31 @@ class WorkUaParser(AbstractResumeParser):
         return educations
 
     def parse_single_resume(self, url: str) -> Optional[Resume]:
-        self.driver.get(url)
+        try:
+            resume = self.extract_from_cache(
+                url, html_extractor.extract_resume
+            )
+        except CacheMiss:
+            logging.info(f"Resume is not in the replay cache: {url}")
+            return None
 
-        WebDriverWait(self.driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "h1.mt-0.mb-0"))
-        )
+        if resume:
+            return resume
+
+        if self.use_http:
+            resume = self.fetch_page(url, html_extractor.extract_resume, url)
+            if resume:
+                return resume
+
+            logging.info(f"Falling back to Selenium for resume: {url}")
+
+        return self.parse_single_resume_with_driver(url)
+
+    def parse_single_resume_with_driver(self, url: str) -> Optional[Resume]:
+        self.open_page(url, (By.CSS_SELECTOR, "h1.mt-0.mb-0"), 30)
+
+        if self.extraction_mode != ExtractionMode.LIVE:
+            return self.extract_snapshot(html_extractor.extract_resume, url)
 
         try:
             full_name = self.get_element_text(By.CSS_SELECTOR, "h1.mt-0.mb-0")
@@ -359,41 +431,50 @@ class WorkUaParser(AbstractResumeParser):
             logging.error(f"Error parsing single resume: {str(e)}")
             return None
 
-    def parse_single_page(self, url: str) -> List[Resume]:
-        self.driver.get(url)
-
-        resumes = []
-
-        try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "pjax-resume-list"))
-            )
+    def parse_listing_page(self, url: str) -> ListingPage:
+        page = self.extract_from_cache(
+            url, html_extractor.extract_listing_page
+        )
+        if page is not None:
+            return page
 
-            resume_cards = self.driver.find_elements(
-                By.CSS_SELECTOR,
-                (
-                    "div.card.card-hover.card-search."
-                    "resume-link.card-visited.wordwrap"
-                ),
+        if self.use_http:
+            page = self.fetch_page(
+                url, html_extractor.extract_listing_page, url
             )
+            if page is not None:
+                return page
 
-            resume_links = [
-                resume.find_element(By.TAG_NAME, "a").get_attribute("href")
-                for resume in resume_cards
-            ]
-
-            for resume_link in resume_links:
+            logging.info(f"Falling back to Selenium for page: {url}")
 
-                resume = self.parse_single_resume(resume_link)
+        self.open_page(url, (By.ID, "pjax-resume-list"), 10)
 
-                resume.score = calculate_resume_score(resume)
+        if self.extraction_mode != ExtractionMode.LIVE:
+            return self.extract_snapshot(
+                html_extractor.extract_listing_page, url
+            )
 
-                if resume:
-                    resumes.append(resume)
+        resume_cards = self.driver.find_elements(
+            By.CSS_SELECTOR,
+            (
+                "div.card.card-hover.card-search."
+                "resume-link.card-visited.wordwrap"
+            ),
+        )
 
-        except Exception as e:
-            logging.error(f"Error parsing page: {str(e)}")
-        return resumes
+        return ListingPage(
+            url=url,
+            cards=[
+                ResumeCard(
+                    url=resume.find_element(By.TAG_NAME, "a").get_attribute(
+                        "href"
+                    ),
+                    fingerprint=text_fingerprint(resume.text),
+                )
+                for resume in resume_cards
+            ],
+            next_url=self.find_next_page_url(),
+        )
 
     def build_url(
             self,
@@ -442,39 +523,3 @@ class WorkUaParser(AbstractResumeParser):
             return f"{base_url}?{urlencode(params, safe='+')}"
         else:
             return base_url
-
-    def parse_resumes(
-            self,
-            position: str,
-            city: WorkUaCity = WorkUaCity.ALL_UKRAINE,
-            search_type: WorkUaSearchType = WorkUaSearchType.DEFAULT,
-            salary_from: Optional[WorkUaSalary] = None,
-            salary_to: Optional[WorkUaSalary] = None,
-            no_salary: bool = False,
-            experience: List[WorkUaExperience] = None,
-            public_period: WorkUaPostingPeriod = (
-                WorkUaPostingPeriod.THREE_MONTHS
-            ),
-    ) -> List[Resume]:
-        url = self.build_url(
-            position,
-            city,
-            search_type,
-            salary_from,
-            salary_to,
-            no_salary,
-            experience,
-            public_period,
-        )
-
-        resumes = self.parse_single_page(url)
-
-        while True:
-            url = self.get_next_page_url(url)
-
-            if url:
-                resumes.extend(self.parse_single_page(url))
-            else:
-                break
-
-        return resumes
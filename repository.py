@@ -0,0 +1,123 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from db import connect, create_tables, save_in_chunks, write_resumes
+from parser.resume_types import Resume
+
+T = TypeVar("T")
+
+
+class ResumeRepository:
+    """
+    Database access for the bot that never blocks the event loop.
+
+    Writes run on one writer thread with its own connection, so they
+    are serialized in order instead of contending for SQLite's lock.
+    Reads run on a small pool of threads, each with its own read-only
+    WAL connection, so they go on while a big crawl is being saved.
+
+    Every call takes a function of the db module whose first argument
+    is the connection, e.g. read(select_top_resumes, 10). Coroutines
+    await read and write, crawl jobs on worker threads use read_sync
+    and write_sync.
+    """
+
+    def __init__(self, db_path: str = "resumes.db", readers: int = 4):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections: List[sqlite3.Connection] = []
+        self.writer = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="db-writer",
+            initializer=self.open_connection,
+        )
+        self.readers = ThreadPoolExecutor(
+            max_workers=readers,
+            thread_name_prefix="db-reader",
+            initializer=self.open_connection,
+            initargs=(True,),
+        )
+        self.writer.submit(lambda: None).result()
+
+    def open_connection(self, read_only: bool = False) -> None:
+        conn = connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if read_only:
+            conn.execute("PRAGMA query_only=1")
+        else:
+            create_tables(conn)
+
+        self.local.conn = conn
+        with self.lock:
+            self.connections.append(conn)
+
+    def run(self, func: Callable[..., T], *args) -> T:
+        return func(self.local.conn, *args)
+
+    def submit_read(self, func: Callable[..., T], *args) -> "Future[T]":
+        return self.readers.submit(self.run, func, *args)
+
+    def submit_write(self, func: Callable[..., T], *args) -> "Future[T]":
+        return self.writer.submit(self.run, func, *args)
+
+    async def read(self, func: Callable[..., T], *args) -> T:
+        return await asyncio.wrap_future(self.submit_read(func, *args))
+
+    async def write(self, func: Callable[..., T], *args) -> T:
+        return await asyncio.wrap_future(self.submit_write(func, *args))
+
+    def read_sync(self, func: Callable[..., T], *args) -> T:
+        return self.submit_read(func, *args).result()
+
+    def write_sync(self, func: Callable[..., T], *args) -> T:
+        return self.submit_write(func, *args).result()
+
+    def save_resumes(
+        self,
+        resumes: Iterable[Resume],
+        search_id: Optional[int] = None,
+        seen_at: Optional[float] = None,
+        commit_every: int = 500,
+        commit_interval: float = 1.0,
+    ) -> int:
+        """
+        Save resumes from a blocking iterable, such as a crawl.
+
+        Chunks are collected on the calling thread and upserted on the
+        writer thread, one chunk is written while the next is collected.
+        """
+
+        if seen_at is None:
+            seen_at = time.time()
+
+        pending: Optional[Future] = None
+
+        def write(chunk: List[Resume]) -> None:
+            nonlocal pending
+            if pending is not None:
+                pending.result()
+            pending = self.submit_write(
+                write_resumes, chunk, seen_at, search_id
+            )
+
+        try:
+            return save_in_chunks(
+                resumes, write, commit_every, commit_interval
+            )
+        finally:
+            if pending is not None:
+                pending.result()
+
+    def close(self) -> None:
+        self.writer.shutdown(wait=True)
+        self.readers.shutdown(wait=True)
+
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
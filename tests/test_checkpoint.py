@@ -0,0 +1,188 @@
+from contextlib import closing
+from itertools import islice
+
+import pytest
+from selenium.common import TimeoutException
+
+from parser.abstract_parser import AbstractResumeParser
+from parser.checkpoint import CrawlStateStore
+from parser.resume_types import ListingPage, Resume, ResumeCard
+
+START_URL = "https://example.com/resumes?page=1"
+PAGES = {
+    START_URL: (["a", "b"], "https://example.com/resumes?page=2"),
+    "https://example.com/resumes?page=2": (
+        ["c", "d"],
+        "https://example.com/resumes?page=3",
+    ),
+    "https://example.com/resumes?page=3": (["e"], None),
+}
+
+
+class FakeParser(AbstractResumeParser):
+    """
+    Serves PAGES without a browser and records the resumes fetched.
+
+    The resumes and listing pages in failing time out like a page that
+    never loads.
+    """
+
+    def __init__(self, checkpoints=None, failing=(), **kwargs):
+        super().__init__(checkpoints=checkpoints, **kwargs)
+        self.failing = set(failing)
+        self.fetched = []
+
+    def parse_listing_page(self, url):
+        if url in self.failing:
+            raise TimeoutException(f"Timed out loading {url}")
+        names, next_url = PAGES[url]
+        return ListingPage(
+            url=url,
+            cards=[ResumeCard(url=f"https://example.com/{n}") for n in names],
+            next_url=next_url,
+        )
+
+    def parse_single_resume(self, url):
+        name = url.rsplit("/", 1)[1]
+        self.fetched.append(name)
+        if name in self.failing:
+            raise TimeoutException(f"Timed out loading {url}")
+        return Resume(
+            full_name=None,
+            position=None,
+            experience_years=None,
+            skills=None,
+            details=None,
+            location=None,
+            salary=None,
+            url=url,
+            experience=[],
+            education=[],
+            languages=[],
+        )
+
+    def parse_language(self, *args):
+        pass
+
+    def parse_experiences(self, *args):
+        pass
+
+    def parse_education(self, *args):
+        pass
+
+    def build_url(self, **kwargs):
+        return START_URL
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CrawlStateStore(str(tmp_path / "resumes.db"))
+
+
+def interrupt(parser, resumes, search_id=None):
+    """Take the first resumes of a crawl, then stop it like a crash."""
+
+    with closing(parser.iter_crawl(START_URL, search_id=search_id)) as crawl:
+        list(islice(crawl, resumes))
+
+
+def test_interrupted_crawl_resumes_where_it_stopped(store):
+    first = FakeParser(store)
+    interrupt(first, 4, search_id=1)
+    assert first.fetched == ["a", "b", "c", "d"]
+
+    unfinished = store.find_unfinished(START_URL)
+    assert unfinished.next_url == "https://example.com/resumes?page=2"
+    assert unfinished.done_resumes == {
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/c",
+    }
+
+    second = FakeParser(store)
+    assert [
+        resume.url for resume in second.iter_crawl(START_URL, search_id=1)
+    ] == ["https://example.com/d", "https://example.com/e"]
+    assert second.fetched == ["d", "e"]
+    assert store.find_unfinished(START_URL) is None
+
+
+def test_resumed_crawl_retries_a_failed_resume(store):
+    first = FakeParser(store, failing={"c"})
+    interrupt(first, 3)
+    assert first.fetched == ["a", "b", "c", "d"]
+
+    second = FakeParser(store)
+    assert [resume.url[-1] for resume in second.iter_crawl(START_URL)] == [
+        "c",
+        "d",
+        "e",
+    ]
+    assert store.find_unfinished(START_URL) is None
+
+
+def test_resumed_crawl_gets_past_a_resume_that_keeps_failing(store):
+    interrupt(FakeParser(store, failing={"c"}), 3)
+
+    second = FakeParser(store, failing={"c"})
+    assert [resume.url[-1] for resume in second.iter_crawl(START_URL)] == [
+        "d",
+        "e",
+    ]
+    assert second.fetched == ["c", "d", "e"]
+    assert store.find_unfinished(START_URL) is None
+
+
+def test_crawl_of_another_search_starts_over(store):
+    interrupt(FakeParser(store), 3, search_id=1)
+
+    parser = FakeParser(store)
+    assert len(list(parser.iter_crawl(START_URL, search_id=2))) == 5
+    assert parser.fetched == ["a", "b", "c", "d", "e"]
+
+
+def test_running_crawl_is_not_joined(store):
+    running = store.start(START_URL, search_id=1)
+    assert store.find_unfinished(START_URL) is None
+
+    other = store.start(START_URL)
+    assert other.id != running.id
+
+    store.release(running)
+    assert store.find_unfinished(START_URL, search_id=1).id == running.id
+
+
+def test_failing_resume_doesnt_end_the_crawl():
+    parser = FakeParser(failing={"c"})
+
+    assert [resume.url[-1] for resume in parser.crawl(START_URL)] == [
+        "a",
+        "b",
+        "d",
+        "e",
+    ]
+
+
+def test_top_cards_crawl_isnt_finished_with_a_failed_resume(store):
+    first = FakeParser(store, failing={"c"}, detail_top_k=10)
+    assert len(first.crawl(START_URL)) == 4
+    assert store.find_unfinished(START_URL) is not None
+
+    second = FakeParser(store, detail_top_k=10)
+    assert [resume.url[-1] for resume in second.crawl(START_URL)] == ["c"]
+    assert store.find_unfinished(START_URL) is None
+
+
+def test_top_cards_crawl_isnt_finished_after_a_listing_error(store):
+    page = "https://example.com/resumes?page=2"
+    first = FakeParser(store, failing={page}, detail_top_k=10)
+    assert len(first.crawl(START_URL)) == 2
+    assert store.find_unfinished(START_URL) is not None
+
+    second = FakeParser(store, detail_top_k=10)
+    assert sorted(resume.url[-1] for resume in second.crawl(START_URL)) == [
+        "c",
+        "d",
+        "e",
+    ]
+    assert store.find_unfinished(START_URL) is None
@@ -0,0 +1,261 @@
+import time
+
+import pytest
+
+from db import (
+    SNIPPET_END,
+    SNIPPET_START,
+    delete_old_searches,
+    insert_search,
+    open_database,
+    save_in_chunks,
+    save_resumes_to_db,
+    select_known_resumes,
+    select_resumes_by_skills,
+    select_search_hits,
+    select_top_resumes,
+    write_resumes,
+)
+from parser.resume_types import Experience, Resume
+
+
+def make_resume(url, full_name="Ivan Petrenko", skills=None, **fields):
+    return Resume(
+        full_name=full_name,
+        position=fields.pop("position", "Python developer"),
+        experience_years=fields.pop("experience_years", 3),
+        skills=skills if skills is not None else ["Python", "Django"],
+        details=fields.pop(
+            "details", "Backend developer, REST APIs on Django and Postgres"
+        ),
+        location=fields.pop("location", "Kyiv"),
+        salary=fields.pop("salary", 1000),
+        url=url,
+        score=fields.pop("score", 10.0),
+        experience=fields.pop(
+            "experience",
+            [
+                Experience(
+                    position="Backend developer",
+                    company="Acme",
+                    company_type=None,
+                    description="Payment APIs",
+                    years=2,
+                )
+            ],
+        ),
+        education=[],
+        languages=[],
+        **fields,
+    )
+
+
+@pytest.fixture
+def conn(tmp_path):
+    with open_database(str(tmp_path / "resumes.db")) as conn:
+        yield conn
+
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_save_in_chunks_splits_by_size():
+    chunks = []
+    saved = save_in_chunks(range(1200), chunks.append, commit_every=500)
+
+    assert saved == 1200
+    assert [len(chunk) for chunk in chunks] == [500, 500, 200]
+
+
+def test_save_resumes_to_db_writes_every_chunk(tmp_path):
+    db_path = str(tmp_path / "resumes.db")
+    resumes = [
+        make_resume(f"https://www.work.ua/resumes/{i}/", full_name=f"N{i}")
+        for i in range(1, 1201)
+    ]
+
+    assert save_resumes_to_db(resumes, db_path, commit_every=500) == 1200
+    with open_database(db_path) as conn:
+        assert count(conn, "resumes") == 1200
+        assert count(conn, "experiences") == 1200
+
+
+def test_write_resumes_upserts_by_resume_key(conn):
+    url = "https://www.work.ua/resumes/123/"
+    write_resumes(conn, [make_resume(url)], seen_at=1.0)
+    resume_id = conn.execute("SELECT id FROM resumes").fetchone()[0]
+
+    write_resumes(conn, [make_resume(url + "?utm=1")], seen_at=2.0)
+    row = conn.execute("SELECT id, seen_at FROM resumes").fetchone()
+    assert tuple(row) == (resume_id, 2.0)
+    assert count(conn, "experiences") == 1
+
+    write_resumes(
+        conn, [make_resume(url, experience=[], score=5.0)], seen_at=3.0
+    )
+    assert count(conn, "resumes") == 1
+    assert count(conn, "experiences") == 0
+    assert select_top_resumes(conn)[0].score == 5.0
+
+
+def test_known_resumes_are_found_by_resume_key(conn):
+    stored = "https://www.work.ua/resumes/123/"
+    write_resumes(
+        conn, [make_resume(stored, fingerprint="v1")], seen_at=1.0
+    )
+    write_resumes(
+        conn,
+        [make_resume("https://www.work.ua/resumes/200/", full_name="B")],
+        seen_at=1.0,
+    )
+
+    card_url = "https://work.ua/resumes/123/?utm=1"
+    known = select_known_resumes(
+        conn, [card_url, "https://www.work.ua/resumes/200/"]
+    )
+    assert list(known) == [card_url]
+    assert known[card_url].url == stored
+    assert known[card_url].fingerprint == "v1"
+
+
+def test_cross_site_duplicate_is_merged(conn):
+    search_id = insert_search(conn)
+    write_resumes(
+        conn,
+        [make_resume("https://www.work.ua/resumes/123/")],
+        seen_at=1.0,
+        search_id=search_id,
+    )
+    write_resumes(
+        conn,
+        [
+            make_resume(
+                "https://robota.ua/candidates/555",
+                skills=["Python", "Django", "Docker"],
+            )
+        ],
+        seen_at=2.0,
+        search_id=search_id,
+    )
+
+    resumes = select_top_resumes(conn, search_id=search_id)
+    assert [resume.url for resume in resumes] == [
+        "https://www.work.ua/resumes/123/"
+    ]
+    assert resumes[0].skills == ["Python", "Django", "Docker"]
+
+
+def test_resume_found_by_two_searches_is_stored_once(conn):
+    first, second = insert_search(conn), insert_search(conn)
+    url = "https://www.work.ua/resumes/123/"
+    write_resumes(conn, [make_resume(url)], seen_at=1.0, search_id=first)
+    write_resumes(conn, [make_resume(url)], seen_at=2.0, search_id=second)
+
+    assert count(conn, "resumes") == 1
+    assert count(conn, "search_resumes") == 2
+    for search_id in (first, second):
+        assert [
+            resume.url
+            for resume in select_top_resumes(conn, search_id=search_id)
+        ] == [url]
+
+
+def test_full_text_search(conn):
+    write_resumes(
+        conn,
+        [
+            make_resume("https://www.work.ua/resumes/1/"),
+            make_resume(
+                "https://www.work.ua/resumes/2/",
+                full_name="Olena Koval",
+                position="Accountant",
+                skills=["Excel"],
+                details="Payroll and tax reports",
+                experience=[],
+            ),
+        ],
+        seen_at=1.0,
+    )
+
+    hits = select_search_hits(conn, "djang kyiv")
+    assert [resume.url for resume, _ in hits] == [
+        "https://www.work.ua/resumes/1/"
+    ]
+    assert f"{SNIPPET_START}Django{SNIPPET_END}" in hits[0][1]
+    hits = select_search_hits(conn, 'excel"')
+    assert [resume.url for resume, _ in hits] == [
+        "https://www.work.ua/resumes/2/"
+    ]
+    assert select_search_hits(conn, "!!!") == []
+
+
+def test_skills_match_all_or_any(conn):
+    write_resumes(
+        conn,
+        [
+            make_resume(
+                "https://www.work.ua/resumes/1/",
+                full_name="A",
+                skills=["Python", "Postgres"],
+                score=30.0,
+            ),
+            make_resume(
+                "https://www.work.ua/resumes/2/",
+                full_name="B",
+                skills=["Python"],
+                score=20.0,
+            ),
+            make_resume(
+                "https://www.work.ua/resumes/3/",
+                full_name="C",
+                skills=["PostgreSQL", "Go"],
+                score=10.0,
+            ),
+        ],
+        seen_at=1.0,
+    )
+
+    def urls(skills, match_all):
+        return [
+            resume.url[-2]
+            for resume in select_resumes_by_skills(conn, skills, match_all)
+        ]
+
+    assert urls(["py", "postgresql"], True) == ["1"]
+    assert urls(["python", "postgres"], False) == ["1", "2", "3"]
+    assert urls(["python", "rust"], True) == []
+    assert urls(["rust"], False) == []
+
+
+def test_age_out_keeps_resumes_of_newer_searches(conn):
+    old, new = insert_search(conn), insert_search(conn)
+    shared = "https://www.work.ua/resumes/1/"
+    write_resumes(
+        conn,
+        [
+            make_resume(shared),
+            make_resume(
+                "https://www.work.ua/resumes/2/", full_name="Olena Koval"
+            ),
+        ],
+        seen_at=1.0,
+        search_id=old,
+    )
+    write_resumes(conn, [make_resume(shared)], seen_at=2.0, search_id=new)
+    conn.execute(
+        "UPDATE searches SET created_at = ? WHERE id = ?",
+        (time.time() - 3600, old),
+    )
+    conn.commit()
+
+    assert delete_old_searches(conn, max_age=60) == 1
+    assert [
+        row[0] for row in conn.execute("SELECT url FROM resumes")
+    ] == [shared]
+    assert count(conn, "experiences") == 1
+    assert count(conn, "resumes_fts") == 1
+    assert [
+        tuple(row)
+        for row in conn.execute("SELECT search_id FROM search_resumes")
+    ] == [(new,)]
@@ -0,0 +1,19 @@
+from parser.federated import robota_filters
+from parser.robota_ua.robota_ua_parser import RobotaUaParser
+from parser.work_ua.utils import WorkUaExperience
+
+
+def test_robota_filters_build_the_direct_search_url():
+    parser = RobotaUaParser()
+
+    assert parser.build_search_url(
+        **robota_filters("python")
+    ) == parser.build_search_url("python")
+
+
+def test_robota_filters_map_experience():
+    filters = robota_filters(
+        "python", experience=[WorkUaExperience.FROM_2_TO_5_YEARS]
+    )
+
+    assert filters["experience"]